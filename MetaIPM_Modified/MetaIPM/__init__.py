@@ -1,8 +1,22 @@
 from MetaIPM import recruitment
+from MetaIPM import eigen
+from MetaIPM import ensemble
+from MetaIPM import equilibrium
 from MetaIPM import group
+from MetaIPM import history
+from MetaIPM import kernel_cache
+from MetaIPM import mesh
+from MetaIPM import movement
 from MetaIPM import node
 from MetaIPM import path
 from MetaIPM import network
 from MetaIPM import plot_functions
 from MetaIPM import populated_network
-from MetaIPM import utilities
\ No newline at end of file
+from MetaIPM import profiling
+from MetaIPM import result_cache
+from MetaIPM import sensitivity
+from MetaIPM import sweep
+from MetaIPM import tangent
+from MetaIPM import tensor_projection
+from MetaIPM import utilities
+from MetaIPM import workers
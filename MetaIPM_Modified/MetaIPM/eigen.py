@@ -0,0 +1,283 @@
+import numpy as np
+import scipy.sparse.linalg as sparse_linalg
+from MetaIPM import tensor_projection
+from MetaIPM.node import node_populated
+
+
+class annual_operator:
+    """
+    Linear annual projection operator of a density-independent network.
+
+    With g_length = 0 the growth kernels do not depend on biomass and a
+    year of project_network is a linear map of the state
+    (population at the start of the year, age-0 individuals waiting to
+    enter it). The map is applied matrix-free from the monthly kernels,
+    survival, harvest and recruitment of tensor_projection.network_tensor,
+    in the same order as project_network. Movement along paths is
+    applied to the recorded populations after the next month has been
+    projected, so path probabilities and g_migration do not enter the
+    operator.
+
+    The dominant eigenvalue is the asymptotic annual growth rate
+    lambda, the right eigenvector the stable population structure and
+    the left eigenvector the reproductive values.
+    """
+    def __init__(self, network, year=None):
+        '''
+        Parameters
+        ----------
+        network : network.network_populated_paths
+            Built network with g_length = 0 at every node.
+        year : int or None
+            Year whose harvest and spawning probability are used. None
+            uses the last projected year.
+        '''
+        if any(nd.g_length != 0 for nd in network.nodes):
+            raise ValueError("The annual operator needs density-independent "
+                             "growth (g_length = 0 at every node)")
+        engine = tensor_projection.network_tensor(network)
+        if year is None:
+            year = network.n_years - 1
+        self.year = year
+        self.engine = engine
+        self.population_shape = engine.initial_population.shape
+        self.age_0_shape = engine.ratio_at_birth.shape
+        self.n_population = int(np.prod(self.population_shape))
+        self.size = self.n_population + int(np.prod(self.age_0_shape))
+
+        # Kernels at zero biomass, (nodes, n_points, n_points)
+        self.kernels = engine.kernels(np.zeros(self.population_shape))
+        self.survival = [engine.survival *
+                         (1.0 - engine.harvest_level(year, month))
+                         for month in range(engine.n_months)]
+        self.spawn_factor = np.where(
+            engine.spawn,
+            engine.spawn_prob[year] * engine.egg_viability,
+            0.0)[:, np.newaxis]
+
+    def split(self, x):
+        '''Split a state vector into population and age-0 arrays.'''
+        return (x[:self.n_population].reshape(self.population_shape),
+                x[self.n_population:].reshape(self.age_0_shape))
+
+    def join(self, population, age_0):
+        return np.concatenate([population.ravel(), age_0.ravel()])
+
+    def forward(self, x):
+        '''
+        Project a state vector through one year, keeping each month.
+
+        Returns the projected state and, for each month, the population
+        at the start of the month, after age-0 recruits are added and
+        after growth (before survival and harvest).
+        '''
+        engine = self.engine
+        population, age_0 = self.split(np.asarray(x).ravel())
+        age_0_next = np.zeros(self.age_0_shape, dtype=population.dtype)
+        months = []
+        for month in range(engine.n_months):
+            start = population
+            if month in engine.spawn_months:
+                age_0_next += self.spawn_factor * \
+                    (engine.recruit * population).sum(-1)
+            if month == node_populated.age_0_month:
+                new_at_node = age_0.sum(-1)
+                population = population + (
+                    (new_at_node[:, np.newaxis] * engine.ratio_at_birth)
+                    [..., np.newaxis] * engine.age_0_dist)
+            grown = np.matmul(
+                self.kernels, population.swapaxes(-1, -2)
+            ).swapaxes(-1, -2)
+            months.append((start, population, grown))
+            population = grown * self.survival[month][:, np.newaxis, :]
+        return self.join(population, age_0_next), months
+
+    def matvec(self, x):
+        '''Project a state vector through one year.'''
+        return self.forward(x)[0]
+
+    def backward(self, y):
+        '''
+        Apply the transpose of the annual operator, keeping each month.
+
+        Returns the transposed product and, for each month, the adjoint
+        of the population at the end of the month.
+        '''
+        engine = self.engine
+        population_bar, age_0_next_bar = self.split(np.asarray(y).ravel())
+        age_0_bar = np.zeros(self.age_0_shape, dtype=population_bar.dtype)
+        months = [None] * engine.n_months
+        for month in reversed(range(engine.n_months)):
+            months[month] = population_bar
+            population_bar = np.matmul(
+                self.kernels.swapaxes(-1, -2),
+                (population_bar *
+                 self.survival[month][:, np.newaxis, :]).swapaxes(-1, -2)
+            ).swapaxes(-1, -2)
+            if month == node_populated.age_0_month:
+                new_at_node_bar = (population_bar * engine.age_0_dist *
+                                   engine.ratio_at_birth[..., np.newaxis]
+                                   ).sum(-1).sum(-1)
+                age_0_bar += new_at_node_bar[:, np.newaxis]
+            if month in engine.spawn_months:
+                population_bar = population_bar + \
+                    (self.spawn_factor * age_0_next_bar)[..., np.newaxis] * \
+                    engine.recruit
+        return self.join(population_bar, age_0_bar), months
+
+    def rmatvec(self, y):
+        '''Apply the transpose of the annual operator.'''
+        return self.backward(y)[0]
+
+    def linear_operator(self):
+        '''The operator as a scipy.sparse.linalg.LinearOperator.'''
+        return sparse_linalg.LinearOperator(
+            (self.size, self.size), matvec=self.matvec,
+            rmatvec=self.rmatvec, dtype=float)
+
+    def start_vector(self):
+        '''Positive start vector built from the initial populations.'''
+        x = self.join(self.engine.initial_population,
+                      np.zeros(self.age_0_shape))
+        return x + x.mean() * 1e-3 + 1e-12
+
+    def power_iteration(self, apply, tol=1e-12, maxiter=10000):
+        '''Dominant eigenvalue and vector of apply by power iteration.'''
+        x = self.start_vector()
+        x /= np.abs(x).sum()
+        growth_rate = 0.0
+        for iteration in range(maxiter):
+            y = apply(x)
+            new_growth_rate = np.abs(y).sum()
+            x = y / new_growth_rate
+            if abs(new_growth_rate - growth_rate) <= tol * new_growth_rate:
+                return new_growth_rate, x
+            growth_rate = new_growth_rate
+        raise RuntimeError("Power iteration did not converge in " +
+                           str(maxiter) + " iterations")
+
+    def solve(self, method='arpack', tol=1e-12, maxiter=None):
+        '''
+        Find lambda and the stable structure and reproductive values.
+
+        Parameters
+        ----------
+        method : str
+            'arpack' uses scipy.sparse.linalg.eigs on the matrix-free
+            operator; 'power' uses power iteration.
+        tol : real
+            Relative tolerance of the eigenvalue.
+        maxiter : int or None
+            Largest number of iterations. None uses the method's
+            default.
+
+        Returns
+        -------
+        lambda, the dominant eigenvalue. Also sets growth_rate,
+        stable_population (nodes, groups, n_points) and stable_age_0
+        (nodes, groups), scaled to sum to one, and
+        reproductive_value and reproductive_value_age_0, scaled so
+        that their product with the stable structure sums to one.
+        '''
+        if method == 'arpack':
+            operator = self.linear_operator()
+            values, vectors = sparse_linalg.eigs(
+                operator, k=1, which='LM', v0=self.start_vector(), tol=tol,
+                maxiter=maxiter)
+            growth_rate = values[0].real
+            right = vectors[:, 0].real
+            values, vectors = sparse_linalg.eigs(
+                operator.H, k=1, which='LM', v0=self.start_vector(),
+                tol=tol, maxiter=maxiter)
+            left = vectors[:, 0].real
+        elif method == 'power':
+            if maxiter is None:
+                maxiter = 10000
+            growth_rate, right = self.power_iteration(self.matvec, tol,
+                                                      maxiter)
+            _, left = self.power_iteration(self.rmatvec, tol, maxiter)
+        else:
+            raise ValueError("method must be 'arpack' or 'power', not " +
+                             str(method))
+
+        right = right / right.sum()
+        left = left / np.dot(left, right)
+        self.growth_rate = growth_rate
+        self.stable_population, self.stable_age_0 = self.split(right)
+        self.reproductive_value, self.reproductive_value_age_0 = \
+            self.split(left)
+        return growth_rate
+
+
+class lambda_sensitivity:
+    """
+    Sensitivities and elasticities of lambda from one eigen-solve.
+
+    For an annual_operator A with right eigenvector w and left
+    eigenvector v (v . w = 1), the sensitivity of lambda to a parameter
+    theta of A is v . (dA / dtheta) w. Each term is summed over the
+    months of the year from the monthly states of w and adjoints of v
+    (annual_operator.forward and backward). Elasticities are
+    theta / lambda * dlambda / dtheta.
+
+    Sensitivities are given for
+        kernel   (nodes, n_points, n_points) growth kernel entries
+                 K[z', z], the IPM sensitivity surface,
+        survival (nodes, n_points) survival at length,
+        harvest  (nodes, n_points) harvest level at length, in the
+                 months and year where harvest is active,
+        recruit  (nodes, groups, n_points) eggs per individual at length.
+
+    There are none for path probabilities. Under the model's ordering,
+    movement is applied to the recorded populations after the next
+    month has been projected from the unmoved ones (see
+    annual_operator), so paths do not enter A and lambda does not
+    depend on them. Use tangent.tangent_projection for their effect on
+    the recorded populations.
+    """
+    def __init__(self, operator):
+        '''
+        Parameters
+        ----------
+        operator : annual_operator
+            Operator to analyse. It is solved if it has not been.
+        '''
+        if not hasattr(operator, 'growth_rate'):
+            operator.solve()
+        engine = operator.engine
+        growth_rate = operator.growth_rate
+        _, states = operator.forward(operator.join(
+            operator.stable_population, operator.stable_age_0))
+        _, adjoints = operator.backward(operator.join(
+            operator.reproductive_value,
+            operator.reproductive_value_age_0))
+        age_0_next_bar = operator.reproductive_value_age_0
+
+        kernel = np.zeros(operator.kernels.shape)
+        survival = np.zeros(engine.survival.shape)
+        harvest = np.zeros(engine.harvest.shape)
+        recruit = np.zeros(engine.recruit.shape)
+        for month in range(engine.n_months):
+            start, recruited, grown = states[month]
+            adjoint = adjoints[month]
+            harvest_factor = 1.0 - engine.harvest_level(operator.year, month)
+            # Adjoint of the grown population, before survival
+            grown_bar = adjoint * operator.survival[month][:, np.newaxis, :]
+            kernel += np.einsum('ngy,ngz->nyz', grown_bar, recruited)
+            at_length = (adjoint * grown).sum(axis=1)
+            survival += at_length * harvest_factor
+            harvest -= at_length * engine.survival * \
+                engine.harvest_active[:, operator.year, month, np.newaxis]
+            if month in engine.spawn_months:
+                recruit += (operator.spawn_factor * age_0_next_bar
+                            )[..., np.newaxis] * start
+
+        self.growth_rate = growth_rate
+        self.kernel_sensitivity = kernel
+        self.kernel_elasticity = operator.kernels * kernel / growth_rate
+        self.survival_sensitivity = survival
+        self.survival_elasticity = engine.survival * survival / growth_rate
+        self.harvest_sensitivity = harvest
+        self.harvest_elasticity = engine.harvest * harvest / growth_rate
+        self.recruit_sensitivity = recruit
+        self.recruit_elasticity = engine.recruit * recruit / growth_rate
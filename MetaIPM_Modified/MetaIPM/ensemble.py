@@ -0,0 +1,143 @@
+import os
+import numpy as np
+from MetaIPM import history
+from MetaIPM import populated_network
+from MetaIPM import stochastic_wrapper
+from MetaIPM import tensor_projection
+
+
+class network_ensemble:
+    """
+    Project many parameter sets of one network in a single pass.
+
+    Each member is a snapshot of a network's parameters (stochastic
+    draws or deterministic scenarios) taken with
+    tensor_projection.network_tensor. All members must share their
+    nodes, groups, paths and mesh. project advances every member at
+    once with a leading members axis, giving the same populations as
+    running each member through project_network.
+    """
+    def __init__(self, network_creator):
+        self.network_creator = network_creator
+        self.members = []
+        network = network_creator.network
+        self.node_names = [nd.show_node_name() for nd in network.nodes]
+        self.group_names = network.collect_group_names()
+
+    def n_members(self):
+        return len(self.members)
+
+    def add_member(self):
+        '''Add the creator's network, with its current parameters.'''
+        self.members.append(
+            tensor_projection.network_tensor(self.network_creator.network))
+
+    def add_stochastic_members(self, n_members, seed=None):
+        '''
+        Draw and add members with new stochastic parameters.
+
+        Member i is drawn from the stream used for stoch_index i by
+        stochastic_model.run_stochastic_parallel, so both give the
+        same draws for a seed.
+        '''
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
+        for i in range(n_members):
+            stochastic_wrapper.seed_iteration(seed, self.n_members())
+            self.network_creator.new_stochastic_parameters()
+            self.add_member()
+
+    def add_csv_member(self, **csv_inputs):
+        '''
+        Add a member built from CSV inputs.
+
+        Takes the same arguments as
+        populated_network.populate_network_from_csv, for example
+        a scenario with edited node_data.
+        '''
+        creator = populated_network.populate_network_from_csv(**csv_inputs)
+        self.members.append(
+            tensor_projection.network_tensor(creator.network))
+
+    def project(self, batch_size=None, retention=None, run_directory=None):
+        '''
+        Project all members.
+
+        Parameters
+        ----------
+        batch_size : int or None
+            Largest number of members projected together. Smaller
+            batches bound the memory used by the stacked kernels.
+        retention : history.retention_policy or None
+            Which time steps to keep. None keeps every step.
+        run_directory : str or None
+            Directory for memory-mapped outputs and their
+            metadata.json sidecar, as network.set_run_directory.
+            summarize_outputs.open_population_history reopens them.
+
+        Returns
+        -------
+        Array of populations shaped
+        (members, nodes, groups, n_points, times), also kept in
+        self.population with the time index of each kept step in
+        self.times. With the 'summary' policy None is returned and
+        self.node_totals, node_biomass, node_mean_length and
+        node_mean_weight are filled instead.
+        Age-0 individuals are kept in self.age_0.
+        '''
+        if batch_size is None:
+            batch_size = max(1, self.n_members())
+        if retention is None:
+            retention = history.retention_policy()
+        first = self.members[0]
+        n_times = first.n_years * first.n_months + 1
+        state_shape = (self.n_members(),) + first.initial_population.shape
+        self.times = retention.retained_times(n_times, first.n_months)
+        self.age_0 = np.zeros(
+            (self.n_members(),) + first.ratio_at_birth.shape +
+            (first.n_years + 1,))
+        if run_directory is not None:
+            os.makedirs(run_directory, exist_ok=True)
+        if retention.kind == 'summary':
+            self.population = None
+            for name in history.summaries:
+                setattr(self, name, history.allocate(
+                    state_shape[:2] + (n_times,), run_directory, name))
+        else:
+            self.population = history.allocate(
+                state_shape + (len(self.times),), run_directory, 'population',
+                first.dtype)
+
+        for start in range(0, self.n_members(), batch_size):
+            stop = min(start + batch_size, self.n_members())
+            batched = tensor_projection.network_tensor.batch(
+                self.members[start:stop])
+            if retention.kind == 'full':
+                # Project straight into the output
+                ring = self.population[start:stop]
+            else:
+                ring = np.zeros((stop - start,) + state_shape[1:] +
+                                (retention.n_slots(n_times),),
+                                dtype=first.dtype)
+            ring[..., 0] = batched.initial_population
+            store = history.history_store(retention, ring, n_times,
+                                          first.n_months, batched.weights,
+                                          lengths=first.omega)
+            batched.project(ring, self.age_0[start:stop],
+                            commit=store.commit)
+
+            if retention.kind == 'summary':
+                for name in history.summaries:
+                    getattr(self, name)[start:stop] = getattr(store, name)
+            elif retention.kind != 'full':
+                self.population[start:stop] = store.retained_population()[0]
+
+        if run_directory is not None:
+            metadata = self.network_creator.network.history_coordinates()
+            metadata.update(store.metadata())
+            # Populations are stored in time order
+            metadata['columns'] = list(range(len(self.times)))
+            metadata['dims'] = ['member', 'node', 'group', 'length', 'time']
+            history.write_metadata(run_directory, metadata)
+        return self.population
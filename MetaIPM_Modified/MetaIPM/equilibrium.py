@@ -0,0 +1,133 @@
+import numpy as np
+import scipy.optimize as optimize
+from MetaIPM import tensor_projection
+
+
+class equilibrium:
+    """
+    Annual-cycle equilibrium of the density-dependent network.
+
+    One year of project_network is a nonlinear map F of the state
+    (population at the start of the year, age-0 individuals waiting to
+    enter it), through the biomass-dependent growth kernels. The
+    equilibrium is the fixed point F(x) = x, found with
+    scipy.optimize.newton_krylov on the residual F(x) - x, with F
+    evaluated as a black box by the months of
+    tensor_projection.network_tensor. Jacobian products are finite
+    differences of F, so a Newton step costs a few map evaluations.
+
+    The harvest and spawning probability of one year are used for every
+    year. Movement along paths is applied to the recorded populations
+    after the next month has been projected (see eigen.annual_operator),
+    so it does not change the equilibrium state.
+    """
+    def __init__(self, network, year=None):
+        '''
+        Parameters
+        ----------
+        network : network.network_populated_paths
+            Built network.
+        year : int or None
+            Year whose harvest and spawning probability are used. None
+            uses the last projected year.
+        '''
+        self.engine = tensor_projection.network_tensor(network)
+        if year is None:
+            year = network.n_years - 1
+        self.year = year
+        self.population_shape = self.engine.initial_population.shape
+        self.age_0_shape = self.engine.ratio_at_birth.shape
+        self.n_population = int(np.prod(self.population_shape))
+        self.map_evaluations = 0
+
+    def split(self, x):
+        '''Split a state vector into population and age-0 arrays.'''
+        return (x[:self.n_population].reshape(self.population_shape),
+                x[self.n_population:].reshape(self.age_0_shape))
+
+    def join(self, population, age_0):
+        return np.concatenate([population.ravel(), age_0.ravel()])
+
+    def annual_map(self, x):
+        '''Project a state vector through one year.'''
+        engine = self.engine
+        population, waiting = self.split(np.asarray(x, dtype=float))
+        population = population.copy()
+        age_0 = np.zeros(self.age_0_shape + (engine.n_years + 1,))
+        age_0[..., self.year] = waiting
+        for month in range(engine.n_months):
+            population = engine.project_month(population, age_0,
+                                              self.year, month)
+        self.map_evaluations += 1
+        return self.join(population, age_0[..., self.year + 1])
+
+    def warm_start(self, n_years):
+        '''State after n_years of the annual map from the start population.'''
+        x = self.join(self.engine.initial_population,
+                      np.zeros(self.age_0_shape))
+        for year in range(n_years):
+            x = self.annual_map(x)
+        return x
+
+    def solve(self, warm_start_years=20, f_tol=1e-10, maxiter=50,
+              method='lgmres'):
+        '''
+        Find the equilibrium.
+
+        Parameters
+        ----------
+        warm_start_years : int
+            Years of the annual map run from the start population to get
+            the first guess. Too short a warm start may find the trivial
+            equilibrium with no fish.
+        f_tol : real
+            Tolerance of the largest residual |F(x) - x|, relative to the
+            largest entry of the first guess.
+        maxiter : int
+            Largest number of Newton iterations.
+        method : str
+            Krylov method of scipy.optimize.newton_krylov.
+
+        Returns
+        -------
+        True if the solver converged. Also sets population
+        (nodes, groups, n_points) and age_0 (nodes, groups) at the
+        equilibrium, node_totals and node_biomass (nodes), and the
+        diagnostics converged, iterations, residuals (largest relative
+        residual after each iteration), residual (final),
+        map_evaluations (including the warm start) and trivial (the
+        equilibrium has no fish).
+        '''
+        self.map_evaluations = 0
+        x_0 = self.warm_start(warm_start_years)
+        scale = np.abs(x_0).max()
+        if scale == 0:
+            raise ValueError("The warm start population is zero")
+
+        def residual(y):
+            return (self.annual_map(y * scale) - y * scale) / scale
+
+        residuals = []
+
+        def record(y, f):
+            residuals.append(np.abs(f).max())
+
+        try:
+            y = optimize.newton_krylov(residual, x_0 / scale, f_tol=f_tol,
+                                       maxiter=maxiter, method=method,
+                                       callback=record)
+            converged = True
+        except optimize.NoConvergence as error:
+            y = error.args[0]
+            converged = False
+
+        x = y * scale
+        self.population, self.age_0 = self.split(x)
+        self.node_totals = self.population.sum(-1).sum(-1)
+        self.node_biomass = self.engine.biomass(self.population)
+        self.converged = converged
+        self.iterations = len(residuals)
+        self.residuals = residuals
+        self.residual = np.abs(residual(y)).max()
+        self.trivial = bool(np.abs(y).max() <= f_tol)
+        return converged
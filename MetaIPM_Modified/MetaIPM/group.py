@@ -18,7 +18,10 @@ class group:
                       n_years,
                       n_months,
                       n_points,
-                      omega):
+                      omega,
+                      n_slots=None,
+                      dtype=np.float64,
+                      mesh=None):
         '''
         Set starting population.
         Parameters
@@ -37,26 +40,50 @@ class group:
             Number of points in mesh (or annual sub-division) for simulation.
         omega :
             Network's mesh.
+        n_slots : int or None
+            Number of time steps held in population. Time t is kept in
+            column t % n_slots, so fewer slots than time steps keep only
+            the latest steps. None holds every time step.
+        dtype : numpy dtype
+            Floating-point type of population.
+        mesh : mesh.length_mesh or None
+            Quadrature of the network's mesh. None uses the density at
+            omega.
         '''
+        if n_slots is None:
+            n_slots = (n_years * n_months) + 1
         self.age_0 = np.zeros((n_years + 1))
-        self.population = np.zeros([n_points, ((n_years * n_months) + 1)])
+        self.population = np.zeros([n_points, n_slots], dtype=dtype)
 
-        pop_dist_raw = stats.lognorm.pdf(omega,
-                                         loc=0,
-                                         scale=initial_mu,
-                                         s=initial_sd)
+        def pdf(z):
+            return stats.lognorm.pdf(z, loc=0, scale=initial_mu,
+                                     s=initial_sd)
+
+        def cdf(z):
+            return stats.lognorm.cdf(z, loc=0, scale=initial_mu,
+                                     s=initial_sd)
+
+        if mesh is None:
+            pop_dist_raw = pdf(omega)
+        else:
+            pop_dist_raw = mesh.masses(pdf, cdf)
 
         pop_dist_scaled = pop_dist_raw / pop_dist_raw.sum() * start_pop
 
         self.population[:, 0] = pop_dist_scaled
+        self.initial_population = pop_dist_scaled
+
+    def column(self, year):
+        '''Column of population holding a time step.'''
+        return year % self.population.shape[1]
 
     def show_group_pop_dist(self, year):
         '''Show population distriubtion of group for a year.'''
-        return self.population[:, year]
+        return self.population[:, self.column(year)]
 
     def show_group_pop_total(self, year):
         '''Show total population of group for a year.'''
-        return self.population[:, year].sum()
+        return self.population[:, self.column(year)].sum()
 
     def set_reproduction(self,
                          ratio_at_birth=0.5,
@@ -77,15 +104,23 @@ class group:
                     year,
                     length_weight,
                     maturity_prob,
-                    omega
+                    omega,
+                    recruit=None
                     ):
-        '''Have spawning occur in a group.'''
+        '''
+        Have spawning occur in a group.
+
+        recruit is the recruitment at each length of omega, if already
+        evaluated (node.vital_rate_table). None evaluates it.
+        '''
         if self.produce_eggs:
             #biomass_in = (
             #    length_weight(omega) *
             #    maturity_prob(omega) *
             #    self.show_group_pop_dist(year)).sum()
-            return (self.recruit(length_weight(omega))*self.show_group_pop_dist(year)).sum()
+            if recruit is None:
+                recruit = self.recruit(length_weight(omega))
+            return (recruit*self.show_group_pop_dist(year)).sum()
         else:
             return 0.0
 
@@ -101,7 +136,10 @@ class group_populated(group):
                 network.n_years,
                 network.n_months,
                 network.n_points,
-                network.omega)
+                network.omega,
+                network.history_slots(),
+                network.dtype,
+                network.mesh)
 
         self.set_reproduction(
             ratio_at_birth=node_group_data["RatioAtBirth"][index],
@@ -0,0 +1,387 @@
+import json
+import os
+import numpy as np
+
+# Node summaries kept by the 'summary' policy, when present
+summaries = ['node_totals', 'node_biomass', 'node_mean_length',
+             'node_mean_weight']
+
+
+def allocate(shape, directory=None, name=None, dtype=float):
+    '''
+    Allocate a zeroed array, in memory or as a memory-mapped file.
+
+    With a directory the array is the .npy file name in it, opened
+    with np.lib.format.open_memmap. An existing file of the same shape
+    and dtype is reused, so readers holding it open are not truncated.
+    '''
+    if directory is None:
+        return np.zeros(shape, dtype=dtype)
+    file_name = os.path.join(directory, name + '.npy')
+    if os.path.exists(file_name):
+        existing = np.load(file_name, mmap_mode='r+')
+        if existing.shape == tuple(shape) and existing.dtype == dtype:
+            existing[...] = 0
+            return existing
+        del existing
+    return np.lib.format.open_memmap(file_name, mode='w+', dtype=dtype,
+                                     shape=tuple(shape))
+
+
+def allocate_ring(policy, shape, n_times, directory=None, dtype=float):
+    '''
+    Allocate the working ring of populations for a policy.
+
+    shape is the (..., nodes, groups, n_points) shape of one time
+    step. With the 'full' and 'window' policies the ring is also the
+    retained history, so it is kept in the directory when one is given.
+    '''
+    if policy.kind not in ['full', 'window']:
+        directory = None
+    return allocate(tuple(shape) + (policy.n_slots(n_times),),
+                    directory, 'population', dtype)
+
+
+def write_metadata(directory, metadata):
+    '''Write the metadata.json sidecar of a run directory.'''
+    with open(os.path.join(directory, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+
+def open_run(directory, mode='r'):
+    '''
+    Open the arrays of a run directory without copying them.
+
+    Returns the metadata sidecar and a dictionary of memory-mapped
+    arrays, keyed by the names in metadata['arrays'].
+    '''
+    with open(os.path.join(directory, 'metadata.json')) as f:
+        metadata = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, name + '.npy'),
+                            mmap_mode=mode)
+              for name in metadata['arrays']}
+    return metadata, arrays
+
+
+class retention_policy:
+    """
+    Which time steps of a projection are kept.
+
+    kind is one of
+        'full'        every time step (the default),
+        'every'       every k-th time step, starting with the first,
+        'year_starts' the first month of each year,
+        'window'      the last window time steps,
+        'summary'     only node totals and biomass at each time step.
+
+    Populations are projected in a ring of columns, so only the
+    retained steps (plus two working columns) are allocated.
+    """
+    kinds = ['full', 'every', 'year_starts', 'window', 'summary']
+
+    def __init__(self, kind='full', every=1, window=None):
+        if kind not in self.kinds:
+            raise ValueError("kind must be one of " + ", ".join(self.kinds))
+        if kind == 'every' and every < 1:
+            raise ValueError("every must be at least 1")
+        if kind == 'window' and (window is None or window < 1):
+            raise ValueError("window must be at least 1")
+        self.kind = kind
+        self.every = every
+        self.window = window
+
+    def n_slots(self, n_times):
+        '''Number of columns in the working ring of populations.'''
+        if self.kind == 'full':
+            return n_times
+        elif self.kind == 'window':
+            return max(2, min(self.window, n_times))
+        return 2
+
+    def retained_times(self, n_times, n_months):
+        '''Time indices whose populations are kept.'''
+        if self.kind == 'full':
+            return np.arange(n_times)
+        elif self.kind == 'every':
+            return np.arange(0, n_times, self.every)
+        elif self.kind == 'year_starts':
+            return np.arange(0, n_times, n_months)
+        elif self.kind == 'window':
+            return np.arange(n_times - min(self.window, n_times), n_times)
+        return np.arange(0)
+
+
+class convergence_rule:
+    """
+    Stopping rule for projections that have settled.
+
+    At the start of each year the populations are compared with the
+    start of the previous year. A node has settled when its total is
+    below extinction in both years, or when its total changed by at
+    most tolerance relative to the previous year and its distribution
+    over groups and length (normalized to sum to one) by at most
+    tolerance in L1 distance. The projection stops once every node has
+    settled for years consecutive years, counting only years from
+    start_year on, when the yearly inputs no longer change (see
+    network_projection.steady_year).
+
+    With fill the rest of the history repeats the last projected year;
+    otherwise the steps that were not projected are NaN.
+    """
+    def __init__(self, tolerance, years=3, extinction=1e-6, fill=True):
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive")
+        if years < 1:
+            raise ValueError("years must be at least 1")
+        self.tolerance = tolerance
+        self.years = years
+        self.extinction = extinction
+        self.fill = fill
+        self.reset()
+
+    def reset(self, start_year=0, n_months=1):
+        '''Forget the previous run.'''
+        self.start_year = start_year
+        self.n_months = n_months
+        self.streak = 0
+        self.state = None
+        self.last_year = None
+
+    def record(self, time, population):
+        '''Keep the final population of a time step of the current year.'''
+        if self.last_year is None:
+            self.last_year = np.zeros(population.shape + (self.n_months,),
+                                      dtype=population.dtype)
+        self.last_year[..., time % self.n_months] = population
+
+    def settled(self, year, population):
+        '''
+        Whether to stop before projecting year.
+
+        population is the (..., nodes, groups, n_points) state at the
+        start of year, before age-0 recruits are added.
+        '''
+        previous = self.state
+        self.state = np.array(population)
+        if previous is None or year - 1 < self.start_year:
+            self.streak = 0
+            return False
+        totals = self.state.sum(-1).sum(-1)
+        previous_totals = previous.sum(-1).sum(-1)
+        extinct = (totals <= self.extinction) & \
+            (previous_totals <= self.extinction)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.abs(totals - previous_totals) / previous_totals
+            distance = np.abs(
+                self.state / totals[..., np.newaxis, np.newaxis] -
+                previous / previous_totals[..., np.newaxis, np.newaxis]
+            ).sum(-1).sum(-1)
+        steady = (change <= self.tolerance) & (distance <= self.tolerance)
+        if np.all(extinct | steady):
+            self.streak += 1
+        else:
+            self.streak = 0
+        return self.streak >= self.years
+
+
+class node_state:
+    """
+    Summaries of each node's population at one time step.
+
+    The snapshot is computed once and shared by everything that needs
+    it in that step: density-dependent growth, migration and the
+    'summary' history. update keeps it while the time step is the
+    same, so the population must not change in between without
+    invalidate (the object engine invalidates after age-0 recruits
+    and movement).
+
+    Attributes
+    ----------
+    time : int or None
+        Time step of the snapshot, None when there is none.
+    abundance, biomass : array
+        (..., nodes) number and weight of individuals.
+    length_total : array or None
+        (..., nodes) summed length of individuals, None without
+        lengths.
+    mean_length, mean_weight : array
+        (..., nodes) average length (None without lengths) and weight
+        of an individual, zero in empty nodes. Computed when read.
+    """
+    def __init__(self, weights, lengths=None):
+        '''
+        Parameters
+        ----------
+        weights : array
+            (..., nodes, n_points) weight at length.
+        lengths : array or None
+            Lengths of the mesh (network.omega), for the mean lengths.
+            Without them no lengths are summed.
+        '''
+        self.weights = weights
+        self.lengths = lengths
+        self.length_total = None
+        self.time = None
+
+    def update(self, time, population):
+        '''
+        Summarize a (..., nodes, groups, n_points) population at a
+        time step, unless the snapshot already holds that step.
+        '''
+        if self.time is not None and self.time == time:
+            return self
+        self.abundance = population.sum(-1).sum(-1)
+        self.biomass = (population *
+                        self.weights[..., np.newaxis, :]).sum(-1).sum(-1)
+        if self.lengths is not None:
+            self.length_total = (population.sum(-2) *
+                                 self.lengths).sum(-1)
+        self.time = time
+        return self
+
+    def per_individual(self, total):
+        return np.divide(total, self.abundance,
+                         out=np.zeros(np.shape(total)),
+                         where=self.abundance > 0)
+
+    @property
+    def mean_length(self):
+        if self.length_total is None:
+            return None
+        return self.per_individual(self.length_total)
+
+    @property
+    def mean_weight(self):
+        return self.per_individual(self.biomass)
+
+    def invalidate(self):
+        '''Drop the snapshot after the population has changed.'''
+        self.time = None
+
+
+class history_store:
+    """
+    Storage for the populations a retention_policy keeps.
+
+    ring holds the working populations, shaped (..., n_points, slots),
+    with time t in column t % slots. After the population at a time is
+    final, commit copies it to the retained store or the node
+    summaries as the policy requires.
+
+    With a directory, the retained populations and node summaries are
+    memory-mapped .npy files in it (see allocate).
+    """
+    def __init__(self, policy, ring, n_times, n_months, weights,
+                 directory=None, lengths=None):
+        '''
+        Parameters
+        ----------
+        policy : retention_policy
+            Which time steps to keep.
+        ring : array
+            Working populations shaped (..., nodes, groups, n_points,
+            slots) with policy.n_slots(n_times) slots.
+        n_times : int
+            Number of time steps in the run, including the start.
+        n_months : int
+            Number of months in a year.
+        weights : array
+            (..., nodes, n_points) weight at length, for node biomass.
+        directory : str or None
+            Run directory for the retained populations and summaries.
+        lengths : array or None
+            Lengths of the mesh. With the 'summary' policy the mean
+            length and weight of each node are then kept as well, in
+            node_mean_length and node_mean_weight.
+        '''
+        self.policy = policy
+        self.ring = ring
+        self.n_times = n_times
+        self.weights = weights
+        # Node summaries of the latest step, shared with the engine
+        self.state = node_state(
+            weights, lengths if policy.kind == 'summary' else None)
+        self.times = policy.retained_times(n_times, n_months)
+
+        state_shape = ring.shape[:-1]
+        if policy.kind in ['every', 'year_starts']:
+            self.slots = {time: slot for slot, time in enumerate(self.times)}
+            self.retained = allocate(state_shape + (len(self.times),),
+                                     directory, 'population', ring.dtype)
+        elif policy.kind == 'summary':
+            self.node_totals = allocate(state_shape[:-2] + (n_times,),
+                                        directory, 'node_totals')
+            self.node_biomass = allocate(state_shape[:-2] + (n_times,),
+                                         directory, 'node_biomass')
+            if lengths is not None:
+                self.node_mean_length = allocate(
+                    state_shape[:-2] + (n_times,), directory,
+                    'node_mean_length')
+                self.node_mean_weight = allocate(
+                    state_shape[:-2] + (n_times,), directory,
+                    'node_mean_weight')
+
+    def metadata(self):
+        '''
+        Describe the stored arrays for a run directory's sidecar.
+
+        columns gives the column of the stored population holding each
+        retained time, which differs from its order only for 'window'.
+        '''
+        if self.policy.kind == 'summary':
+            arrays = [name for name in summaries if hasattr(self, name)]
+            columns = []
+        elif self.policy.kind == 'window':
+            arrays = ['population']
+            columns = self.times % self.ring.shape[-1]
+        else:
+            arrays = ['population']
+            columns = np.arange(len(self.times))
+        return {'retention': self.policy.kind,
+                'times': [int(time) for time in self.times],
+                'columns': [int(column) for column in columns],
+                'arrays': arrays}
+
+    def column(self, time):
+        '''Ring column holding a time step.'''
+        return time % self.ring.shape[-1]
+
+    def arrays(self):
+        '''The arrays holding the history, by name.'''
+        arrays = {'ring': self.ring}
+        for name in ['retained'] + summaries:
+            if hasattr(self, name):
+                arrays[name] = getattr(self, name)
+        return arrays
+
+    def commit(self, time):
+        '''Keep the final population of a time step.'''
+        population = self.ring[..., self.column(time)]
+        if self.policy.kind in ['every', 'year_starts']:
+            if time in self.slots:
+                self.retained[..., self.slots[time]] = population
+        elif self.policy.kind == 'summary':
+            state = self.state.update(time, population)
+            self.node_totals[..., time] = state.abundance
+            self.node_biomass[..., time] = state.biomass
+            if state.length_total is not None:
+                self.node_mean_length[..., time] = state.mean_length
+                self.node_mean_weight[..., time] = state.mean_weight
+
+    def retained_population(self):
+        '''
+        Return the retained populations and their time indices.
+
+        The populations are shaped (..., nodes, groups, n_points, times).
+        '''
+        kind = self.policy.kind
+        if kind == 'summary':
+            raise ValueError("Populations are not retained by the "
+                             "'summary' policy; use node_totals and "
+                             "node_biomass")
+        elif kind == 'full':
+            return self.ring, self.times
+        elif kind == 'window':
+            return self.ring[..., self.times % self.ring.shape[-1]], \
+                self.times
+        return self.retained, self.times
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sparse
+
+
+class growth_kernel_cache:
+    """
+    Bounded least-recently-used cache of growth kernels.
+
+    A node's growth kernel depends on the population only through the
+    density shift exp(-g_length * biomass). Kernels are keyed on the
+    node's growth parameters and mesh plus the (optionally quantized)
+    shift, so new parameter draws never reuse a stale kernel.
+    """
+    def __init__(self, maxsize=128, quantization=None):
+        '''
+        Parameters
+        ----------
+        maxsize : int
+            Largest number of kernels held before the least recently
+            used kernel is evicted.
+        quantization : real or None
+            Step used to round the density shift before it is used.
+            None keys on the exact shift, so results are unchanged.
+            A step such as 1e-6 trades a small approximation for
+            many more hits once biomass settles near equilibrium.
+        '''
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.quantization = quantization
+        self.kernels = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, shift):
+        '''Round the density shift to the cache's quantization step.'''
+        if self.quantization is None:
+            return shift
+        return np.round(shift / self.quantization) * self.quantization
+
+    def lookup(self, parameters, shift, build):
+        '''
+        Return the kernel for parameters and shift.
+
+        Parameters
+        ----------
+        parameters : tuple
+            Hashable growth parameters and mesh the kernel depends on.
+        shift : real
+            Density shift of the von Bertalanffy location.
+        build : callable
+            Called with the quantized shift to build a kernel on a miss.
+        '''
+        shift = self.quantize(shift)
+        key = (parameters, shift)
+        kernel = self.kernels.get(key)
+        if kernel is not None:
+            self.hits += 1
+            self.kernels.move_to_end(key)
+            return kernel
+
+        self.misses += 1
+        kernel = build(shift)
+        # Kernels are shared between months, so guard against edits
+        if sparse.issparse(kernel):
+            kernel.data.flags.writeable = False
+        else:
+            kernel.flags.writeable = False
+        self.kernels[key] = kernel
+        if len(self.kernels) > self.maxsize:
+            self.kernels.popitem(last=False)
+            self.evictions += 1
+        return kernel
+
+    def clear(self):
+        '''Drop all kernels and reset the statistics.'''
+        self.kernels.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        '''Return hit, miss and size statistics as a dictionary.'''
+        calls = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.kernels),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / calls if calls > 0 else 0.0}
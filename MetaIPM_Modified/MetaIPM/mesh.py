@@ -0,0 +1,157 @@
+import numpy as np
+from scipy.special import ndtr
+
+
+def lognorm_pdf(x, s, scale):
+    '''
+    Log-normal density, as scipy.stats.lognorm.pdf with loc=0.
+
+    Written with numpy so that it also accepts a complex scale, which
+    tangent.tangent_projection relies on.
+    '''
+    y = x / scale
+    return np.exp(-np.log(y) ** 2 / (2 * s ** 2)) / \
+        (s * y * np.sqrt(2 * np.pi)) / scale
+
+
+def lognorm_cdf(x, s, scale):
+    '''Log-normal distribution function, accepting a complex scale.'''
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore'):
+        log_x = np.log(np.where(x > 0, x, 0.0))
+    return ndtr((log_x - np.log(scale)) / s)
+
+
+def uniform_edges(min_length, max_length, n_points):
+    '''
+    Edges around the points of the default midpoint mesh.
+
+    The points are n_points evenly spaced lengths strictly inside
+    (min_length, max_length), so the bins leave half a bin at each end
+    of the domain.
+    '''
+    h_width = (max_length - min_length) / (n_points + 1)
+    return min_length + h_width / 2 + h_width * np.arange(n_points + 1)
+
+
+def graded_edges(min_length, max_length, n_points, low, high, ratio):
+    '''
+    Edges of a mesh from min_length to max_length that is ratio times
+    denser between low and high than outside.
+    '''
+    if not min_length <= low < high <= max_length:
+        raise ValueError("The dense part of the mesh must lie within "
+                         "min_length and max_length")
+    if ratio <= 0:
+        raise ValueError("ratio must be positive")
+    # Piecewise-linear cumulative mesh density
+    lengths = np.array([min_length, low, high, max_length], dtype=float)
+    cumulative = np.concatenate([[0.0], np.cumsum(
+        np.diff(lengths) * np.array([1.0, ratio, 1.0]))])
+    return np.interp(np.linspace(0.0, cumulative[-1], n_points + 1),
+                     cumulative, lengths)
+
+
+class length_mesh:
+    """
+    Discretization of the length domain.
+
+    Populations are held as numbers of individuals at the points, so
+    totals, biomass, spawning, survival and harvest are sums over the
+    points on any mesh. Densities are turned into numbers at the points
+    by the quadrature:
+        'midpoint' density at each point times its bin width,
+        'cdf'      probability of each bin, from distribution function
+                   differences (bin-integrated),
+        'gauss'    density at Gauss-Legendre nodes times their weights.
+    The growth kernel's columns and the start and age-0 distributions
+    are built this way and then normalized, as on the default mesh.
+
+    points are the lengths (network.omega), widths the quadrature
+    weights and edges the bin edges (None for 'gauss').
+    """
+    quadratures = ['midpoint', 'cdf', 'gauss']
+
+    def __init__(self, points, widths, edges=None, quadrature='midpoint'):
+        if quadrature not in self.quadratures:
+            raise ValueError("quadrature must be one of " +
+                             ", ".join(self.quadratures))
+        if quadrature == 'cdf' and edges is None:
+            raise ValueError("The 'cdf' quadrature needs bin edges")
+        self.points = np.asarray(points, dtype=float)
+        self.widths = np.asarray(widths, dtype=float)
+        self.edges = None if edges is None else np.asarray(edges,
+                                                           dtype=float)
+        self.quadrature = quadrature
+        self.uniform = bool(np.allclose(self.widths, self.widths[0]))
+
+    @classmethod
+    def build(cls, min_length, max_length, n_points, quadrature='midpoint',
+              focus=None):
+        '''
+        Build a mesh.
+
+        Parameters
+        ----------
+        min_length, max_length : real
+            Limits of the length domain.
+        n_points : int
+            Number of points.
+        quadrature : str
+            'midpoint', 'cdf' or 'gauss' (see length_mesh).
+        focus : tuple or None
+            (low, high, ratio) makes bins between low and high ratio
+            times narrower than outside (graded_edges). None makes
+            them equal. Not used with 'gauss'.
+
+        The default uniform midpoint mesh keeps its points strictly
+        inside the limits (uniform_edges). Other meshes split the
+        domain from min_length to max_length into bins, with the
+        points at their midpoints.
+        '''
+        if quadrature == 'gauss':
+            if focus is not None:
+                raise ValueError("The 'gauss' quadrature has no focus")
+            nodes, weights = np.polynomial.legendre.leggauss(n_points)
+            half = (max_length - min_length) / 2.0
+            return cls(min_length + half * (nodes + 1.0), half * weights,
+                       quadrature=quadrature)
+        if focus is None and quadrature == 'midpoint':
+            edges = uniform_edges(min_length, max_length, n_points)
+            points = np.linspace(start=min_length, stop=max_length,
+                                 num=n_points + 2)[1:-1]
+        else:
+            if focus is None:
+                edges = np.linspace(min_length, max_length, n_points + 1)
+            else:
+                edges = graded_edges(min_length, max_length, n_points,
+                                     *focus)
+            points = (edges[1:] + edges[:-1]) / 2.0
+        return cls(points, np.diff(edges), edges, quadrature)
+
+    @property
+    def kernel_weights(self):
+        '''Weights of the kernel density, None when they are equal.'''
+        if self.quadrature == 'cdf' or (self.quadrature == 'midpoint' and
+                                        self.uniform):
+            return None
+        return self.widths
+
+    @property
+    def kernel_edges(self):
+        '''Bin edges of the bin-integrated kernel, or None.'''
+        return self.edges if self.quadrature == 'cdf' else None
+
+    def masses(self, pdf, cdf):
+        '''
+        Unnormalized numbers at the points of a length distribution.
+
+        pdf and cdf are its density and distribution functions.
+        '''
+        if self.quadrature == 'cdf':
+            cumulative = cdf(self.edges)
+            return cumulative[1:] - cumulative[:-1]
+        density = pdf(self.points)
+        if self.quadrature == 'midpoint' and self.uniform:
+            return density
+        return density * self.widths
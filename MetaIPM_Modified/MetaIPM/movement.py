@@ -0,0 +1,153 @@
+import numpy as np
+import scipy.sparse as sparse
+
+
+class movement_operator:
+    """
+    Index-based movement of groups between nodes.
+
+    The network's populated paths are compiled once into a sparse
+    (node x node) matrix of path probabilities plus, for each node, its
+    outgoing paths in the order of network.populated_paths. Movement is
+    then applied to a stacked (nodes, groups, n_points) population with
+    array operations instead of name matching between paths, nodes
+    and groups.
+
+    Operators for networks with the same nodes and paths may be
+    combined with batch, which adds a leading ensemble axis to the
+    probabilities, migration parameters and populations.
+    """
+    def __init__(self, network, dtype=None):
+        '''
+        Compile the network's populated paths.
+
+        The network's populations must be stacked
+        (network.stack_populations) so groups are aligned by index.
+        Probabilities are held in dtype, by default the network's.
+        '''
+        node_names = [nd.show_node_name() for nd in network.nodes]
+        self.n_nodes = len(node_names)
+        self.g_migration = np.array([nd.g_migration for nd in network.nodes])
+        self.present = network.group_present[:, :, np.newaxis]
+
+        starts = []
+        ends = []
+        probabilities = []
+        # Outgoing paths grouped by their rank at the start node, so
+        # sequential subtraction can be vectorized across nodes
+        ranks = []
+        n_out = np.zeros(self.n_nodes, dtype=int)
+        for path_idx in network.populated_paths:
+            if path_idx.show_start() not in node_names:
+                continue
+            start = node_names.index(path_idx.show_start())
+            if path_idx.show_end() in node_names:
+                end = node_names.index(path_idx.show_end())
+            else:
+                end = -1
+            rank = n_out[start]
+            if rank == len(ranks):
+                ranks.append(([], []))
+            ranks[rank][0].append(start)
+            ranks[rank][1].append(len(probabilities))
+            n_out[start] += 1
+            starts.append(start)
+            ends.append(end)
+            probabilities.append(path_idx.probability)
+
+        self.starts = np.array(starts, dtype=int)
+        self.ends = np.array(ends, dtype=int)
+        self.probabilities = np.array(
+            probabilities, dtype=network.dtype if dtype is None else dtype)
+        self.outgoing = [(np.array(rank_starts), np.array(rank_paths))
+                         for rank_starts, rank_paths in ranks]
+        self.set_transfer()
+
+    def set_transfer(self):
+        '''Build the (end x start) matrix of path probabilities.'''
+        inside = self.ends >= 0
+        if self.probabilities.ndim == 1:
+            self.transfer = sparse.csr_matrix(
+                (self.probabilities[inside],
+                 (self.ends[inside], self.starts[inside])),
+                shape=(self.n_nodes, self.n_nodes))
+        else:
+            batch_shape = self.probabilities.shape[:-1]
+            self.transfer = np.zeros(batch_shape +
+                                     (self.n_nodes, self.n_nodes),
+                                     dtype=self.probabilities.dtype)
+            for path_index in np.flatnonzero(inside):
+                self.transfer[..., self.ends[path_index],
+                              self.starts[path_index]] += \
+                    self.probabilities[..., path_index]
+
+    @classmethod
+    def batch(cls, operators):
+        '''
+        Combine operators of identically structured networks.
+
+        The returned operator moves populations shaped
+        (members, nodes, groups, n_points).
+        '''
+        first = operators[0]
+        for operator in operators[1:]:
+            if (not np.array_equal(operator.starts, first.starts) or
+                    not np.array_equal(operator.ends, first.ends)):
+                raise ValueError("Batched networks must share their paths")
+        batched = cls.__new__(cls)
+        batched.n_nodes = first.n_nodes
+        batched.present = first.present
+        batched.starts = first.starts
+        batched.ends = first.ends
+        batched.outgoing = first.outgoing
+        batched.g_migration = np.stack([op.g_migration for op in operators])
+        batched.probabilities = np.stack([op.probabilities
+                                          for op in operators])
+        batched.set_transfer()
+        return batched
+
+    def migration(self, biomass):
+        '''Density-dependent migration factor for each start node.'''
+        return 2 - np.exp(-self.g_migration * biomass)
+
+    def apply(self, population, biomass, profile=None):
+        '''
+        Move individuals along all paths in place.
+
+        Parameters
+        ----------
+        population : array
+            (nodes, groups, n_points) population, updated in place.
+            Batched operators take a leading members axis.
+        biomass : array
+            Biomass of each node before movement.
+        profile : profiling.phase_profile or None
+            Times loading the paths, moving along them and subtracting
+            the movers from their start nodes.
+        '''
+        migration = self.migration(biomass).astype(population.dtype,
+                                                   copy=False)
+        population_start = population * migration[..., np.newaxis, np.newaxis]
+        flat_shape = population.shape[:-2] + (-1,)
+        if profile is not None:
+            profile.lap('path load')
+
+        if sparse.issparse(self.transfer):
+            incoming = self.transfer.dot(population_start.reshape(flat_shape))
+        else:
+            incoming = np.matmul(self.transfer,
+                                 population_start.reshape(flat_shape))
+        population += incoming.reshape(population.shape) * self.present
+        if profile is not None:
+            profile.lap('path move')
+
+        for rank_starts, rank_paths in self.outgoing:
+            leaving = population_start[..., rank_starts, :, :] * \
+                self.probabilities[..., rank_paths, np.newaxis, np.newaxis]
+            remaining = population[..., rank_starts, :, :] - leaving
+            # Next lines prevents negative (or zombie) fish
+            zombie = remaining.real.min(axis=-1) < 0
+            remaining[zombie] = 0.0
+            population[..., rank_starts, :, :] = remaining
+        if profile is not None:
+            profile.lap('path subtract')
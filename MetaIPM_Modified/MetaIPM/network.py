@@ -1,7 +1,16 @@
+import os
 import numpy as np
 import pandas as pd
 import scipy.stats as stats
+from MetaIPM import history
+from MetaIPM import kernel_cache
+from MetaIPM import mesh
+from MetaIPM import movement
+from MetaIPM import node
 from MetaIPM import path
+from MetaIPM import profiling
+from MetaIPM import tangent
+from MetaIPM import tensor_projection
 
 
 class network:
@@ -10,6 +19,8 @@ class network:
         self.network_name = network_name
         self.nodes = []
         self.populated_paths = []
+        self.parameter_overrides = {}
+        self.parameter_defaults = {}
 
     def show_network_name(self):
         return self.network_name
@@ -26,17 +37,26 @@ class network:
 
 class network_mesh(network):
     """Adds in network mesh for the population's length distribution."""
-    def set_mesh(self, n_years, n_points, min_length, max_length, n_months):
+    def set_mesh(self, n_years, n_points, min_length, max_length, n_months,
+                 quadrature='midpoint', focus=None):
+        '''
+        Set the time steps and the length mesh.
+
+        quadrature and focus choose the discretization of the length
+        domain (see mesh.length_mesh.build). The defaults are the
+        uniform midpoint mesh.
+        '''
         self.n_points = n_points
         self.min_length = min_length
         self.max_length = max_length
         self.n_years = n_years
         self.n_months = n_months
 
-        self.omega = np.linspace(start=self.min_length,
-                                 stop=self.max_length,
-                                 num=self.n_points + 2)[1:-1]
-        self.h_width = self.omega[1] - self.omega[0]
+        self.mesh = mesh.length_mesh.build(min_length, max_length, n_points,
+                                           quadrature, focus)
+        self.omega = self.mesh.points
+        # Bin width of a uniform mesh; see self.mesh.widths otherwise
+        self.h_width = self.mesh.widths[0] if self.mesh.uniform else None
 
 
 class network_spawn(network_mesh):
@@ -59,11 +79,22 @@ class network_spawn(network_mesh):
 class network_spawn_pd(network_spawn):
     '''Sets spawning probability using pandas (pd) data.frame.'''
     def add_network_parameters(self, network_data, stochastic_spawn=True):
+        # Optional columns: quadrature, and mesh_focus as "low;high;ratio"
+        quadrature = 'midpoint'
+        if ('quadrature' in network_data.columns and
+                isinstance(network_data['quadrature'].values[0], str)):
+            quadrature = network_data['quadrature'].values[0]
+        focus = None
+        if ('mesh_focus' in network_data.columns and
+                isinstance(network_data['mesh_focus'].values[0], str)):
+            focus = tuple(map(float,
+                              network_data['mesh_focus'].values[0].split(";")))
         self.set_mesh(network_data['n_years'].values[0],
                       network_data['n_points'].values[0],
                       network_data['min_length'].values[0],
                       network_data['max_length'].values[0],
-                      network_data['no_months'].values[0])
+                      network_data['no_months'].values[0],
+                      quadrature, focus)
 
         self.set_spawn(
             list(map(int, network_data['spawn_months'].values[0].split(";"))),
@@ -84,51 +115,625 @@ class network_spawn_pd(network_spawn):
 
 class network_projection():
     """Includes population projection functions for network model."""
-    def project_network(self):
+    history_retention = history.retention_policy()
+    convergence_check = None
+    kernel_tolerance = None
+    kernel_max_fill = node.default_max_fill
+    profile = None
+    stopped_year = None
+    run_directory = None
+    dtype = np.dtype(np.float64)
+
+    def project_network(self, engine='object', tangent_parameters=None):
+        '''
+        Project the network through all years and months.
+
+        Parameters
+        ----------
+        engine : str
+            'object' steps each node, group and path in turn.
+            'tensor' advances every node and group at once with
+            tensor_projection.network_tensor. Both give the same results.
+        tangent_parameters : list or None
+            Parameter keys to differentiate by. When given, the
+            derivatives of the populations, node totals, biomass and
+            yearly growth rates are also projected and kept in
+            self.tangents (see tangent.tangent_projection).
+
+        With a convergence check (set_convergence_check) the projection
+        may stop early; stopped_year is then the year it stopped at,
+        otherwise None. With profiling (set_profiling) the time of
+        each phase is added to self.profile.
+        '''
+        if tangent_parameters is not None:
+            self.tangents = tangent.tangent_projection(self,
+                                                       tangent_parameters)
+            self.tangents.project()
+        if engine not in ['object', 'tensor']:
+            raise ValueError("engine must be 'object' or 'tensor', not " +
+                             str(engine))
+
+        rule = self.convergence_check
+        stop = None
+        if rule is not None:
+            rule.reset(self.steady_year(), self.n_months)
+            stop = rule.settled
+
+        def commit(time):
+            if rule is not None:
+                rule.record(time, self.population_tensor[
+                    ..., self.history.column(time)])
+            self.history.commit(time)
+
+        profile = self.profile
+        if profile is not None:
+            profile.start()
+
+        self.stopped_year = None
+        if engine == 'tensor':
+            tensor_engine = tensor_projection.network_tensor(self)
+            tensor_engine.profile = profile
+            if profile is not None:
+                self.record_allocations()
+                profile.lap('setup')
+            self.stopped_year = tensor_engine.project(
+                self.population_tensor, self.age_0_tensor,
+                commit=commit, stop=stop)
+            if self.stopped_year is not None:
+                self.finish_stopped_run()
+                if profile is not None:
+                    profile.lap('finish')
+            return
+
+        self.stack_populations()
+        movement_op = movement.movement_operator(self)
+        if profile is not None:
+            self.record_allocations()
+            profile.lap('setup')
         for year in range(self.n_years):
+            if stop is not None and year > 0 and stop(
+                    year, self.population_tensor[
+                        ..., self.history.column(year * self.n_months)]):
+                if profile is not None:
+                    profile.lap('convergence check')
+                self.stopped_year = year
+                self.finish_stopped_run()
+                if profile is not None:
+                    profile.lap('finish')
+                return
+            if stop is not None and profile is not None:
+                profile.lap('convergence check')
             for month in range(self.n_months):
-                current_time_index = year * self.n_months + month
-
-                # Project through time
-                for node_idx in self.nodes:
-                    node_idx.project_node(year, month, self)
-
-                # Load paths
-                for path_idx in self.populated_paths:
-                    path_start = path_idx.show_start()
-                    for start_node in self.nodes:
-                        node_name = start_node.show_node_name()
-                        if path_start == node_name:
-                            path_idx.add_to_path(
-                                node=start_node,
-                                year=current_time_index,
-                                network=self)
-
-                # Move to new nodes
-                for path_idx in self.populated_paths:
-                    for end_node in self.nodes:
-                        if path_idx.show_end() == end_node.show_node_name():
-                            path_idx.add_to_node(
-                                node=end_node,
-                                year=current_time_index)
-
-                # Remove from old nodes
-                for path_idx in self.populated_paths:
-                    path_start = path_idx.show_start()
-                    for start_node in self.nodes:
-                        node_name = start_node.show_node_name()
-                        if path_start == node_name:
-                            path_idx.subtract_from_node(
-                                node=start_node,
-                                year=current_time_index)
+                self.project_month(year, month, movement_op)
+                commit(year * self.n_months + month)
+                if profile is not None:
+                    profile.lap('history commit')
+
+        commit(self.n_years * self.n_months)
+        if profile is not None:
+            profile.lap('history commit')
+
+    def project_month(self, year, month, movement_op):
+        '''
+        Project every node one month with the object engine, then move
+        the month's populations along paths.
+
+        movement_op is the network's movement.movement_operator. The
+        populations of the month must be in place (stack_populations).
+        '''
+        profile = self.profile
+        current_time_index = year * self.n_months + month
+
+        # Project through time
+        state = self.node_state(current_time_index)
+        if profile is not None:
+            profile.lap('node state')
+        for node_index, node_idx in enumerate(self.nodes):
+            node_idx.project_node(year, month, self,
+                                 state.biomass[node_index])
+        if month == node.node_populated.age_0_month:
+            state.invalidate()
+
+        # Move between nodes along paths
+        biomass = self.node_state(current_time_index).biomass
+        if profile is not None:
+            profile.lap('node state')
+        movement_op.apply(
+            self.population_tensor[
+                :, :, :, self.history.column(current_time_index)],
+            biomass, profile)
+        state.invalidate()
+
+    def finish_stopped_run(self):
+        '''
+        Complete the history of a run stopped at stopped_year.
+
+        With the convergence check's fill, the remaining years repeat
+        the last projected year and the final step is the settled
+        state, with waiting age-0 individuals moved to the last year.
+        Otherwise the steps that were not projected are NaN.
+        '''
+        rule = self.convergence_check
+        n_times = self.n_years * self.n_months + 1
+        start = self.stopped_year * self.n_months
+        for time in range(start, n_times):
+            if not rule.fill:
+                population = np.nan
+            elif time == n_times - 1:
+                population = rule.state
+            else:
+                population = rule.last_year[..., time % self.n_months]
+            self.population_tensor[..., self.history.column(time)] = \
+                population
+            self.history.commit(time)
+        if rule.fill:
+            waiting = self.age_0_tensor[..., self.stopped_year].copy()
+            self.age_0_tensor[..., self.stopped_year] = 0.0
+            self.age_0_tensor[..., -1] = waiting
+        else:
+            self.age_0_tensor[..., self.stopped_year + 1:] = np.nan
+        if self.run_directory is not None:
+            metadata, _ = history.open_run(self.run_directory)
+            metadata['stopped_year'] = int(self.stopped_year)
+            history.write_metadata(self.run_directory, metadata)
+
+    def set_convergence_check(self, tolerance=None, years=3,
+                              extinction=1e-6, fill=True):
+        '''
+        Stop projections once the populations settle.
+
+        See history.convergence_rule for the rule and its parameters.
+        The check only counts years from steady_year on. A tolerance
+        of None runs every year, the default.
+        '''
+        if tolerance is None:
+            self.convergence_check = None
+        else:
+            self.convergence_check = history.convergence_rule(
+                tolerance, years, extinction, fill)
+
+    def steady_year(self):
+        '''
+        First year from which the yearly inputs no longer change.
+
+        The spawning probability and each node's harvest years are the
+        inputs that vary by year.
+        '''
+        changes = [0]
+        spawn_prob = np.broadcast_to(self.spawn_prob, (self.n_years,))
+        changes += list(np.nonzero(np.diff(spawn_prob))[0] + 1)
+        for node_idx in self.nodes:
+            changes += [year for year in [node_idx.harvest_start,
+                                          node_idx.harvest_end + 1]
+                        if 0 < year < self.n_years]
+        return int(max(changes))
 
     def clear_nodes(self):
         for node_idx in self.nodes:
             node_idx.clear_nonstart_group()
 
+    def set_history_retention(self, kind='full', every=1, window=None):
+        '''
+        Choose which time steps of a projection are kept.
+
+        See history.retention_policy for the kinds. Group populations
+        are reallocated and reset to their start distributions.
+        After a run, retained_population returns the kept steps and,
+        for 'summary', history.node_totals, node_biomass,
+        node_mean_length and node_mean_weight hold the node summaries.
+        '''
+        self.history_retention = history.retention_policy(
+            kind=kind, every=every, window=window)
+        if self.n_nodes() > 0:
+            self.stack_populations()
+            self.clear_nodes()
+
+    def set_run_directory(self, directory):
+        '''
+        Keep the projected history in memory-mapped files.
+
+        The retained populations (or node summaries) are written
+        through .npy files in directory as the network is projected,
+        next to a metadata.json sidecar with the mesh, time steps and
+        node and group names. summarize_outputs.open_population_history
+        reopens them later without copying. None keeps the history in
+        memory. Group populations are reset to their start
+        distributions.
+        '''
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.run_directory = directory
+        self.population_tensor = None
+        if self.n_nodes() > 0:
+            self.stack_populations()
+            self.clear_nodes()
+
+    def set_dtype(self, dtype):
+        '''
+        Choose the floating-point type of populations and kernels.
+
+        np.float32 halves the memory of the history and kernels at the
+        cost of precision; benchmarks/float32_accuracy.py compares it
+        with np.float64, the default. Group populations are
+        reallocated and reset to their start distributions.
+        '''
+        dtype = np.dtype(dtype)
+        if dtype not in [np.dtype(np.float32), np.dtype(np.float64)]:
+            raise ValueError("dtype must be float32 or float64")
+        self.dtype = dtype
+        self.population_tensor = None
+        if self.n_nodes() > 0:
+            self.stack_populations()
+            self.clear_nodes()
+
+    def history_coordinates(self):
+        '''Mesh, time and name coordinates of the network's history.'''
+        group_names = self.collect_group_names()
+        present = np.zeros((self.n_nodes(), len(group_names)), dtype=bool)
+        pairs = []
+        for node_index, node_idx in enumerate(self.nodes):
+            for grp in node_idx.groups:
+                group_index = group_names.index(grp.show_group_name())
+                present[node_index, group_index] = True
+                pairs.append([node_index, group_index])
+        return {'omega': self.omega.tolist(),
+                'mesh_widths': self.mesh.widths.tolist(),
+                'quadrature': self.mesh.quadrature,
+                'n_years': int(self.n_years),
+                'n_months': int(self.n_months),
+                'nodes': [node_idx.show_node_name()
+                          for node_idx in self.nodes],
+                'groups': group_names,
+                'present': present.tolist(),
+                'pairs': pairs,
+                'weights': [node_idx.length_weight(self.omega).tolist()
+                            for node_idx in self.nodes]}
+
+    def node_state(self, time):
+        '''
+        Summaries of each node's population at a time step.
+
+        Returns the history's history.node_state, computed once per
+        step from the stacked populations.
+        '''
+        return self.history.state.update(
+            time, self.population_tensor[..., self.history.column(time)])
+
+    def history_slots(self):
+        '''Number of time steps held in each group's population.'''
+        return self.history_retention.n_slots(
+            self.n_years * self.n_months + 1)
+
+    def retained_population(self):
+        '''
+        Return the populations kept by the retention policy.
+
+        Returns the (nodes, groups, n_points, times) populations and
+        the time index of each kept step.
+        '''
+        return self.history.retained_population()
+
+    def collect_group_names(self):
+        '''Names of all groups in the network, in order of appearance.'''
+        group_names = []
+        for node_idx in self.nodes:
+            for grp in node_idx.groups:
+                if grp.show_group_name() not in group_names:
+                    group_names.append(grp.show_group_name())
+        return group_names
+
+    def stack_populations(self):
+        '''
+        Store all group populations in one contiguous array.
+
+        population_tensor has shape (nodes, groups, n_points, slots) and
+        age_0_tensor has shape (nodes, groups, n_years + 1). Time t is
+        held in slot history.column(t); with the default retention
+        there is one slot per time step. Groups are aligned by name
+        across nodes; group_present marks which (node, group) pairs
+        exist. Each group's population and age_0 become views into the
+        stacked arrays, so either may be updated. With a run directory
+        (set_run_directory) the retained history is memory-mapped there.
+        '''
+        group_names = self.collect_group_names()
+        n_times = self.n_years * self.n_months + 1
+        n_slots = self.history_slots()
+        shape = (self.n_nodes(), len(group_names), self.n_points)
+
+        stacked = getattr(self, 'population_tensor', None)
+        if (stacked is not None and stacked.shape == shape + (n_slots,) and
+                stacked.dtype == self.dtype and
+                group_names == self.group_names and
+                all(np.may_share_memory(grp.population, stacked)
+                    for node_idx in self.nodes for grp in node_idx.groups)):
+            # Groups are already views into the stack
+            population_tensor = stacked
+        else:
+            populations = [[grp.population for grp in node_idx.groups]
+                           for node_idx in self.nodes]
+            if self.run_directory is not None:
+                # The old stack may be the file that is about to be reused
+                populations = [[np.array(pop) for pop in node_pops]
+                               for node_pops in populations]
+            population_tensor = history.allocate_ring(
+                self.history_retention, shape, n_times, self.run_directory,
+                self.dtype)
+            age_0_tensor = np.zeros(shape[:2] + (self.n_years + 1,))
+            group_present = np.zeros(shape[:2], dtype=bool)
+
+            for node_index, node_idx in enumerate(self.nodes):
+                for grp, pop in zip(node_idx.groups, populations[node_index]):
+                    group_index = group_names.index(grp.show_group_name())
+                    if pop.shape[1] == n_slots:
+                        population_tensor[node_index, group_index] = pop
+                    else:
+                        population_tensor[node_index, group_index, :, 0] = \
+                            grp.initial_population
+                    age_0_tensor[node_index, group_index] = grp.age_0
+                    group_present[node_index, group_index] = True
+                    grp.population = population_tensor[node_index,
+                                                       group_index]
+                    grp.age_0 = age_0_tensor[node_index, group_index]
+
+            self.group_names = group_names
+            self.population_tensor = population_tensor
+            self.age_0_tensor = age_0_tensor
+            self.group_present = group_present
+
+        self.history = history.history_store(
+            self.history_retention, population_tensor, n_times,
+            self.n_months,
+            np.stack([node_idx.length_weight(self.omega)
+                      for node_idx in self.nodes]),
+            self.run_directory, self.omega)
+        if self.run_directory is not None:
+            metadata = self.history_coordinates()
+            metadata.update(self.history.metadata())
+            metadata['dims'] = ['node', 'group', 'length', 'time']
+            history.write_metadata(self.run_directory, metadata)
+
+    def set_kernel_cache(self, maxsize=128, quantization=None):
+        '''
+        Give each node a bounded LRU cache of growth kernels.
+
+        Caches persist across clear_nodes and new stochastic draws,
+        so repeated runs reuse kernels. See
+        kernel_cache.growth_kernel_cache for the parameters.
+        Use maxsize=None to remove the caches.
+        '''
+        for node_idx in self.nodes:
+            if maxsize is None:
+                node_idx.kernel_cache = None
+            else:
+                node_idx.kernel_cache = kernel_cache.growth_kernel_cache(
+                    maxsize=maxsize,
+                    quantization=quantization)
+
+    def set_profiling(self, enabled=True, callback=None):
+        '''
+        Time the phases of project_network.
+
+        With profiling on, self.profile is a profiling.phase_profile
+        that adds up the wall time and calls of each phase (kernel
+        build, spawning, age-0 recruitment, growth matvec,
+        survival/harvest, path load, move and subtract, ...) over
+        projections, and records the bytes of the history arrays.
+        print(network.profile) shows a table and
+        network.profile.report() a dictionary. callback, if given, is
+        called with each phase and its seconds as they end. Profiling
+        is off by default and costs next to nothing then.
+        '''
+        if enabled:
+            self.profile = profiling.phase_profile(callback)
+        else:
+            self.profile = None
+
+    def record_allocations(self):
+        '''Record the sizes of the history arrays in self.profile.'''
+        self.profile.allocated('population_tensor', self.population_tensor)
+        self.profile.allocated('age_0_tensor', self.age_0_tensor)
+        for name, array in self.history.arrays().items():
+            if name != 'ring':
+                self.profile.allocated('history.' + name, array)
+
+    def set_kernel_truncation(self, tolerance=None,
+                              max_fill=node.default_max_fill):
+        '''
+        Truncate growth kernels to a band and store them sparse.
+
+        Kernel entries below tolerance times the peak density of their
+        column are dropped and columns renormalized
+        (node.banded_growth_kernel), so kernels are built and applied
+        in O(n_points * band) operations. Kernels whose band keeps more
+        than max_fill of the entries stay dense. A tolerance of None,
+        the default, keeps full dense kernels.
+        '''
+        if tolerance is not None and not 0 < tolerance < 1:
+            raise ValueError("tolerance must be between 0 and 1")
+        self.kernel_tolerance = tolerance
+        self.kernel_max_fill = max_fill
+
+    def kernel_cache_stats(self):
+        '''Return growth kernel cache statistics for each node.'''
+        return {node_idx.show_node_name(): node_idx.kernel_cache.stats()
+                for node_idx in self.nodes
+                if node_idx.kernel_cache is not None}
+
 
 class network_populated_paths(network_spawn_pd, network_projection):
     """Includes populated paths as part of the network."""
+    # Network attributes parameter overrides may set. The others are
+    # the mesh and time steps, or only enter through these (spawn_a
+    # and spawn_b through spawn_prob).
+    network_parameters = ['spawn_prob', 'egg_viability']
+
+    def find_node(self, node_name):
+        for nd in self.nodes:
+            if nd.show_node_name() == node_name:
+                return nd
+        raise ValueError(str(node_name) + " is not a node in the network")
+
+    def find_paths(self, start, end):
+        paths = [path_idx for path_idx in self.populated_paths
+                 if path_idx.show_start() == start and
+                 path_idx.show_end() == end]
+        if len(paths) == 0:
+            raise ValueError("There is no path from " + str(start) +
+                             " to " + str(end))
+        return paths
+
+    def set_node_parameter(self, node_name, name, value):
+        '''
+        Set a node's parameter on the built network.
+
+        See node_populated.set_parameter. For example,
+        set_node_parameter('a', 'harvest_max', 0.8).
+        '''
+        self.set_parameter_override(('node', node_name, name), value)
+
+    def set_path_probability(self, start, end, probability):
+        '''Set the movement probability of the path from start to end.'''
+        self.set_parameter_override(('path', start, end), probability)
+
+    def set_network_parameter(self, name, value):
+        '''
+        Set a network-level parameter, one of network_parameters.
+
+        A scalar spawn_prob is used for every year; otherwise it gives
+        one value per year.
+        '''
+        self.set_parameter_override(('network', name), value)
+
+    def set_parameter_override(self, key, value):
+        '''
+        Apply and record a parameter override.
+
+        Overrides are applied in place without rebuilding the network
+        from its tables and are reapplied after new stochastic
+        parameters are drawn (populate_network_from_csv.
+        new_stochastic_parameters). Growth kernels and movement are
+        rebuilt from the current parameters on every projection, so
+        only clear_nodes is needed before projecting again.
+        '''
+        default = self.parameter_defaults.get(key)
+        if key not in self.parameter_defaults:
+            default = self.parameter_value(key)
+        self.apply_parameter(key, value)
+        self.parameter_defaults[key] = default
+        self.parameter_overrides[key] = value
+
+    def parameter_value(self, key):
+        '''Current value of the parameter named by an override key.'''
+        if key[0] == 'node':
+            node_idx = self.find_node(key[1])
+            node_idx.check_parameter(key[2])
+            return getattr(node_idx, key[2])
+        elif key[0] == 'path':
+            return self.find_paths(key[1], key[2])[0].probability
+        elif key[0] == 'network':
+            self.check_parameter(key[1])
+            return getattr(self, key[1])
+        raise ValueError("Unknown parameter kind " + str(key[0]))
+
+    def check_parameter(self, name):
+        if name not in self.network_parameters:
+            raise ValueError(str(name) + " is not a parameter of the "
+                             "network; use one of " +
+                             ", ".join(self.network_parameters))
+
+    def apply_parameter(self, key, value):
+        if key[0] == 'node':
+            self.find_node(key[1]).set_parameter(key[2], value)
+        elif key[0] == 'path':
+            for path_idx in self.find_paths(key[1], key[2]):
+                path_idx.probability = value
+        elif key[0] == 'network':
+            self.check_parameter(key[1])
+            if key[1] == 'spawn_prob' and np.ndim(value) == 0:
+                value = np.repeat(value, self.n_years)
+            elif key[1] == 'spawn_prob' and np.shape(value) != \
+                    (self.n_years,):
+                raise ValueError("spawn_prob needs one value per year")
+            setattr(self, key[1], value)
+        else:
+            raise ValueError("Unknown parameter kind " + str(key[0]))
+
+    def restore_parameter_defaults(self):
+        '''
+        Put back the values the overrides replaced, keeping the
+        overrides recorded for apply_parameter_overrides.
+        '''
+        for key, value in self.parameter_defaults.items():
+            self.apply_parameter(key, value)
+
+    def apply_parameter_overrides(self):
+        '''
+        Reapply all recorded parameter overrides.
+
+        The current values become the ones clear_parameter_overrides
+        restores, so call restore_parameter_defaults before drawing
+        new parameters and this after.
+        '''
+        for key, value in self.parameter_overrides.items():
+            self.parameter_defaults[key] = self.parameter_value(key)
+            self.apply_parameter(key, value)
+
+    def clear_parameter_override(self, key):
+        '''Restore one overridden parameter to its earlier value.'''
+        self.apply_parameter(key, self.parameter_defaults.pop(key))
+        del self.parameter_overrides[key]
+
+    def clear_parameter_overrides(self):
+        '''Restore the overridden parameters to their earlier values.'''
+        self.restore_parameter_defaults()
+        self.parameter_overrides = {}
+        self.parameter_defaults = {}
+
+    def run_settings(self):
+        '''
+        Settings made on the built network that affect its results.
+
+        These are the retention policy, dtype, kernel cache and
+        truncation, convergence check and parameter overrides: all
+        that a network rebuilt from the same input tables
+        (populate_network_from_csv.input_data) lacks. Pass them to
+        apply_run_settings, for example in worker processes. The run
+        directory is left out, as copies of a network must not share
+        its files.
+        '''
+        cache = self.nodes[0].kernel_cache if self.nodes else None
+        rule = self.convergence_check
+        return {
+            'retention': dict(vars(self.history_retention)),
+            'dtype': str(self.dtype),
+            'kernel_cache': None if cache is None else {
+                'maxsize': cache.maxsize,
+                'quantization': cache.quantization},
+            'kernel_truncation': {'tolerance': self.kernel_tolerance,
+                                  'max_fill': self.kernel_max_fill},
+            'convergence': None if rule is None else {
+                'tolerance': rule.tolerance, 'years': rule.years,
+                'extinction': rule.extinction, 'fill': rule.fill},
+            'parameter_overrides': dict(self.parameter_overrides)}
+
+    def apply_run_settings(self, settings):
+        '''
+        Make the settings returned by run_settings on this network.
+
+        Group populations are reset to their start distributions.
+        '''
+        self.set_history_retention(**settings['retention'])
+        self.set_dtype(settings['dtype'])
+        if settings['kernel_cache'] is None:
+            self.set_kernel_cache(maxsize=None)
+        else:
+            self.set_kernel_cache(**settings['kernel_cache'])
+        self.set_kernel_truncation(**settings['kernel_truncation'])
+        self.set_convergence_check(**(settings['convergence'] or {}))
+        self.clear_parameter_overrides()
+        for key, value in settings['parameter_overrides'].items():
+            self.set_parameter_override(key, value)
+
     def initialize_nodes_in_network(self):
         for nd in self.nodes:
             nd.initialize_node(self)
@@ -1,7 +1,146 @@
 import numpy as np
 from scipy.special import expit
 import scipy.stats as stats
+import scipy.sparse as sparse
+from scipy.special import ndtr
 from MetaIPM import group
+from MetaIPM import recruitment
+
+_norm_pdf_C = np.sqrt(2 * np.pi)
+
+# Largest fraction of entries a truncated growth kernel keeps before
+# the dense kernel is built instead (see banded_growth_kernel)
+default_max_fill = 0.5
+
+
+def growth_kernel(z_prime, location, scale, dtype=np.float64,
+                  weights=None, edges=None):
+    """
+    Build column-normalized growth kernels in one array pass.
+
+    Column j of a kernel is the normal density of z_prime around
+    location[j], times the quadrature weights if given, divided by its
+    sum. With bin edges the column is instead the normal probability
+    of each bin (see mesh.length_mesh). Columns without mass stay zero.
+    Leading axes of location and scale broadcast, so a stack of
+    kernels can be built at once.
+
+    Parameters
+    ----------
+    z_prime : array
+        Lengths at the next time step (kernel rows).
+    location : array
+        Expected next length for each current length (kernel columns).
+    scale : real or array
+        Standard deviation of growth.
+    dtype : numpy dtype
+        Floating-point type the kernels are evaluated in.
+    weights : array or None
+        Quadrature weights of z_prime. None weighs the points equally.
+    edges : array or None
+        Bin edges around z_prime, for bin-integrated kernels.
+    """
+    location = np.asarray(location, dtype=dtype)
+    scale = np.asarray(scale, dtype=dtype)[..., np.newaxis, np.newaxis]
+    # Evaluate as (..., z, z_prime) so each column is summed contiguously
+    if edges is not None:
+        x = (np.asarray(edges, dtype=dtype) -
+             location[..., np.newaxis]) / scale
+        cumulative = ndtr(x)
+        prob_raw = cumulative[..., 1:] - cumulative[..., :-1]
+    else:
+        z_prime = np.asarray(z_prime, dtype=dtype)
+        x = (z_prime - location[..., np.newaxis]) / scale
+        prob_raw = np.exp(-x ** 2 / 2.0) / \
+            np.dtype(dtype).type(_norm_pdf_C) / scale
+        if weights is not None:
+            prob_raw = prob_raw * np.asarray(weights, dtype=dtype)
+    prob_sum = prob_raw.sum(axis=-1, keepdims=True)
+    project = np.divide(prob_raw, prob_sum,
+                        out=np.zeros_like(prob_raw),
+                        where=prob_sum != 0)
+    return np.ascontiguousarray(np.swapaxes(project, -1, -2))
+
+
+def banded_growth_kernel(z_prime, location, scale, tolerance,
+                         dtype=np.float64, weights=None, edges=None,
+                         max_fill=default_max_fill):
+    """
+    Build a truncated growth kernel as a sparse matrix.
+
+    Entries of column j are kept where the normal density around
+    location[j] is at least tolerance times its peak, within
+    scale * sqrt(2 log(1 / tolerance)) of location[j] (widened by half
+    the largest bin with edges). Each column is a contiguous band of
+    rows, so the kernel is built and applied in O(n_points * band)
+    operations. Kept entries are computed as in growth_kernel and each
+    column is renormalized over its band, so mass is conserved.
+
+    Parameters
+    ----------
+    z_prime : array
+        Increasing lengths at the next time step (kernel rows).
+    location : array
+        Expected next length for each current length (kernel columns).
+    scale : real
+        Standard deviation of growth.
+    tolerance : real
+        Relative density below which entries are dropped.
+    dtype, weights, edges :
+        As for growth_kernel.
+    max_fill : real
+        Largest fraction of kept entries. Wider bands return the dense
+        growth_kernel instead.
+
+    Returns
+    -------
+    scipy.sparse.csc_matrix, or an array when the band is too wide.
+    """
+    z_prime = np.asarray(z_prime)
+    location = np.asarray(location, dtype=dtype)
+    n_rows = len(z_prime)
+    half_width = scale * np.sqrt(2.0 * np.log(1.0 / tolerance))
+    if edges is not None:
+        half_width = half_width + np.diff(edges).max() / 2.0
+    centers = location.real
+    first = np.searchsorted(z_prime, centers - np.real(half_width), 'left')
+    last = np.searchsorted(z_prime, centers + np.real(half_width), 'right')
+    counts = last - first
+    n_kept = counts.sum()
+    if n_kept > max_fill * n_rows * len(location):
+        return growth_kernel(z_prime, location, scale, dtype, weights, edges)
+    if n_kept == 0:
+        return sparse.csc_matrix((n_rows, len(location)), dtype=dtype)
+
+    columns = np.repeat(np.arange(len(location)), counts)
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    rows = np.repeat(first, counts) + np.arange(n_kept) - \
+        np.repeat(starts[:-1], counts)
+    scale = np.asarray(scale, dtype=dtype)
+    if edges is not None:
+        edges = np.asarray(edges, dtype=dtype)
+        prob_raw = ndtr((edges[rows + 1] - location[columns]) / scale) - \
+            ndtr((edges[rows] - location[columns]) / scale)
+    else:
+        x = (np.asarray(z_prime, dtype=dtype)[rows] -
+             location[columns]) / scale
+        prob_raw = np.exp(-x ** 2 / 2.0) / \
+            np.dtype(dtype).type(_norm_pdf_C) / scale
+        if weights is not None:
+            prob_raw = prob_raw * np.asarray(weights, dtype=dtype)[rows]
+    # Column j is the segment starts[j]:starts[j + 1] of the entries.
+    # reduceat sums each segment up to the next start; a trailing zero
+    # keeps the starts of empty last columns (n_kept) in range. An
+    # empty column's start equals the next one, for which reduceat
+    # returns that single entry, so empty columns are set to zero.
+    prob_sum = np.add.reduceat(np.append(prob_raw, 0), starts[:-1])
+    prob_sum[counts == 0] = 0
+    column_sum = prob_sum[columns]
+    project = np.divide(prob_raw, column_sum,
+                        out=np.zeros_like(prob_raw),
+                        where=column_sum != 0)
+    return sparse.csc_matrix((project, rows, starts),
+                             shape=(n_rows, len(location)))
 
 
 class logistic:
@@ -20,6 +159,88 @@ class logistic:
         return out
 
 
+class vital_rate_table:
+    """
+    Vital rates of a node evaluated on the network's mesh.
+
+    None of these change within a run, so node_populated.vital_rates
+    builds the table once and rebuilds it when a parameter it depends
+    on changes. Parameters written directly (node.surv_max = x) are
+    noticed through inputs, which the table compares on every use;
+    harvest_level and the groups' recruit functions are compared by
+    identity, so changes to harvest_* and egg_* parameters need
+    set_parameter (or set_harvest_level and set_recruitment).
+
+    Attributes
+    ----------
+    survival : array
+        Monthly survival at length, in the network's dtype.
+    harvest : array
+        Harvest curve at length, in the network's dtype, applied in
+        the node's harvest months.
+    weights : array
+        Weight at length (node_populated.length_weight).
+    maturity : array
+        Maturity probability at length.
+    recruit : list
+        Recruits per individual at length for each of the node's
+        groups, None for groups that do not produce eggs.
+    age_0_dist : list
+        Normalized length distribution of each group's age-0 fish.
+    """
+    def __init__(self, node, network):
+        omega = network.omega
+        # What the table was built on, see matches
+        self.omega = omega
+        self.mesh = network.mesh
+        self.dtype = np.dtype(network.dtype)
+        self.n_months = network.n_months
+        self.inputs = self.node_inputs(node)
+
+        self.survival = node.survival(omega).astype(self.dtype, copy=False)
+        self.harvest = node.harvest_level(omega).astype(self.dtype,
+                                                        copy=False)
+        self.weights = node.length_weight(omega)
+        self.maturity = node.maturity_prob(omega)
+
+        age_0_mean = node.vonB_function(1.0 / network.n_months)
+        self.recruit = []
+        self.age_0_dist = []
+        for grp in node.groups:
+            self.recruit.append(grp.recruit(self.weights)
+                                if grp.produce_eggs else None)
+            age_0_dist_raw = network.mesh.masses(
+                lambda z: stats.lognorm.pdf(z, loc=0.0, scale=age_0_mean,
+                                            s=grp.sigma_j),
+                lambda z: stats.lognorm.cdf(z, loc=0.0, scale=age_0_mean,
+                                            s=grp.sigma_j))
+            if age_0_dist_raw.sum() > 0.0:
+                self.age_0_dist.append(age_0_dist_raw / age_0_dist_raw.sum())
+            else:
+                self.age_0_dist.append(np.zeros(len(age_0_dist_raw)))
+
+    @staticmethod
+    def node_inputs(node):
+        '''The node's parameters the table is built from.'''
+        return (node.surv_min, node.surv_max, node.surv_alpha,
+                node.surv_beta, node.lw_beta1, node.lw_beta2,
+                node.mat_alpha, node.mat_beta, node.vonB_K, node.vonB_Linf,
+                node.harvest_level,
+                tuple((grp.recruit, grp.produce_eggs, grp.sigma_j)
+                      for grp in node.groups))
+
+    def matches(self, node, network):
+        '''
+        Whether the table was built from the node's current parameters
+        on the network's current mesh.
+        '''
+        return (self.omega is network.omega and
+                self.mesh is network.mesh and
+                self.dtype == np.dtype(network.dtype) and
+                self.n_months == network.n_months and
+                self.inputs == self.node_inputs(node))
+
+
 class node:
     """Nodes contain groups and exist within the network"""
     def __init__(self, node_name):
@@ -42,6 +263,18 @@ class node_populated(node):
 
     This class also has function to set the group's parameters.
     """
+    # Optional kernel_cache.growth_kernel_cache used by growth
+    kernel_cache = None
+    # vital_rate_table built by vital_rates, None until it is needed
+    vital_rate_cache = None
+    # Month in which age-0 individuals enter the population
+    age_0_month = 0
+    # Parameters that other node attributes are built from
+    harvest_parameters = ['harvest_min', 'harvest_max', 'harvest_slope',
+                          'harvest_inflection']
+    recruit_parameters = ['egg_alpha', 'egg_beta', 'min_recruit',
+                          'max_recruit']
+
     def add_node_parameters(self, node_data):
         pool_id = node_data['Pool'] == self.node_name
         self.Spawn = node_data[pool_id]['Spawn'].values[0]
@@ -62,11 +295,65 @@ class node_populated(node):
         month_use = list(map(int, node_data[pool_id]['harvest_month'].values[0].split(";")))
         self.harvest_months = month_use
 
+        self.set_harvest_level()
+
+    def set_harvest_level(self):
         self.harvest_level = logistic(
             inflection=self.harvest_inflection,
             slope=self.harvest_slope,
             min=self.harvest_min,
             max=self.harvest_max)
+        self.clear_vital_rates()
+
+    def set_recruitment(self):
+        for grp in self.groups:
+            grp.recruit = recruitment.Logistic_recruitment(
+                alpha=self.egg_alpha,
+                beta=self.egg_beta,
+                min_recruit=self.min_recruit,
+                max_recruit=self.max_recruit)
+        self.clear_vital_rates()
+
+    def vital_rates(self, network):
+        '''
+        The node's vital_rate_table on the network's mesh.
+
+        The table is built on first use and kept until a parameter
+        changes or the network's mesh or dtype does.
+        '''
+        if (self.vital_rate_cache is None or
+                not self.vital_rate_cache.matches(self, network)):
+            self.vital_rate_cache = vital_rate_table(self, network)
+        return self.vital_rate_cache
+
+    def clear_vital_rates(self):
+        '''Drop the vital-rate table after a parameter change.'''
+        self.vital_rate_cache = None
+
+    def check_parameter(self, name):
+        if not hasattr(self, name) or callable(getattr(self, name)):
+            raise ValueError(str(name) + " is not a parameter of node " +
+                             self.node_name)
+
+    def set_parameter(self, name, value):
+        '''
+        Override one of the node's parameters in place.
+
+        Only what is built from the parameter is recomputed: the
+        harvest curve for the harvest_* parameters and the groups'
+        recruitment for the egg_* and *_recruit parameters. The
+        vital-rate table is rebuilt on next use. Parameters
+        from the vonB table (vonB_K, surv_max, g_migration, g_length,
+        ...) are per month, that is the table value divided by
+        n_months.
+        '''
+        self.check_parameter(name)
+        setattr(self, name, value)
+        self.clear_vital_rates()
+        if name in self.harvest_parameters:
+            self.set_harvest_level()
+        elif name in self.recruit_parameters:
+            self.set_recruitment()
 
     def set_maturity_parameters(self):
         # Add or update maturity parameters
@@ -188,6 +475,7 @@ class node_populated(node):
         self.set_maturity_parameters()
         self.set_vonB_parameters(network)
         self.set_lw_parameters()
+        self.clear_vital_rates()
 
     def add_group_parameters(self, group_data, network):
         if (self.node_name in group_data['Node'].unique()):
@@ -200,6 +488,7 @@ class node_populated(node):
                                                 node_group_data=node_grp_data,
                                                 network=network)
                 self.add_groups([group_temp])
+            self.clear_vital_rates()
 
         else:
             print("Warning: " +
@@ -210,6 +499,7 @@ class node_populated(node):
         self.set_maturity_parameters()
         self.set_vonB_parameters(network)
         self.set_lw_parameters()
+        self.clear_vital_rates()
 
     def calculate_node_population(self, year):
         pop_temp = 0.0
@@ -235,12 +525,13 @@ class node_populated(node):
     def clear_nonstart_group(self):
         ''' Reset initial conditions and zero out later years.'''
         for grps in self.groups:
-            # Reset the initial population size
-            grps.population[:, 1:] = np.transpose(
-                np.tile(grps.population[:, 0],
-                        (grps.population[:, 1:].shape[1], 1)))
+            # Reset the initial population size. Movement and age-0
+            # recruits change the first column during a run, so use
+            # the distribution saved by set_start_pop.
+            grps.population[:, 0] = grps.initial_population
             # Reset the non-initial population size to zeros
             grps.population[:, 1:] = np.zeros(grps.population[:, 1:].shape)
+            grps.age_0[:] = 0.0
 
     def length_weight(self, length_in):
         '''
@@ -253,31 +544,55 @@ class node_populated(node):
     def maturity_prob(self, length_in):
         return expit(self.mat_alpha + self.mat_beta * length_in)
 
-    def growth(self, length_now, length_next, year, omega):
+    def growth(self, length_now, length_next, year, omega,
+               dtype=np.float64, weights=None, edges=None,
+               tolerance=None, max_fill=default_max_fill, biomass=None):
         z = np.atleast_1d(length_now)
         z_prime = np.atleast_1d(length_next)
-        biomass = self.calculate_node_biomass(year, omega)
-        
-        project = np.zeros((len(z), len(z_prime)))
-        for index in range(0, len(z)):
-            location_parameter = (self.vonB_K * z[index] + \
-                (1 - self.vonB_K) * (self.vonB_Linf)) * \
-                np.exp(-1*self.g_length*biomass) # - self.g_length*biomass)
-            prob_raw = stats.norm.pdf(x=z_prime,
-                                      loc=location_parameter,
-                                      scale=self.vonB_sigma_k)
-            if prob_raw.sum() == 0:
-                project[:, index] = 0
-            else:
-                project[:, index] = prob_raw / prob_raw.sum()
-        return project
-    
+        if biomass is None:
+            biomass = self.calculate_node_biomass(year, omega)
+        shift = np.exp(-1*self.g_length*biomass)
+
+        def build(shift):
+            location_parameter = (self.vonB_K * z + \
+                (1 - self.vonB_K) * (self.vonB_Linf)) * shift
+            if tolerance is not None:
+                return banded_growth_kernel(
+                    z_prime, location_parameter, self.vonB_sigma_k,
+                    tolerance, dtype, weights, edges, max_fill)
+            return growth_kernel(z_prime, location_parameter,
+                                 self.vonB_sigma_k, dtype, weights, edges)
+
+        if self.kernel_cache is None:
+            return build(shift)
+        # Key on every growth input other than biomass so that new
+        # parameter draws (update_group_parameters) never hit old kernels
+        parameters = (self.vonB_K, self.vonB_Linf, self.vonB_sigma_k,
+                      z.tobytes(), z_prime.tobytes(), np.dtype(dtype).str,
+                      None if weights is None else weights.tobytes(),
+                      None if edges is None else edges.tobytes(),
+                      tolerance, max_fill)
+        return self.kernel_cache.lookup(parameters, shift, build)
+
     def survival(self, length_in):
         return self.surv_min + (self.surv_max - self.surv_min) / \
             (1 + np.exp(self.surv_beta*(np.log(length_in) - np.log(self.surv_alpha))))
 
-    def initialize_node(self, network, year=0):
-        self.projection_matrix = self.growth(network.omega, network.omega, year, network.omega)
+    def initialize_node(self, network, year=0, biomass=None):
+        '''
+        Build the growth kernel for a time step.
+
+        biomass is the node's biomass at that step, if already known
+        (network.node_state). None sums it from the groups.
+        '''
+        self.projection_matrix = self.growth(network.omega, network.omega,
+                                             year, network.omega,
+                                             network.dtype,
+                                             network.mesh.kernel_weights,
+                                             network.mesh.kernel_edges,
+                                             network.kernel_tolerance,
+                                             network.kernel_max_fill,
+                                             biomass)
 
     def vonB_function(self, age_in):
         return self.vonB_Linf * (1.0 - np.exp(- self.vonB_K * age_in))
@@ -285,60 +600,66 @@ class node_populated(node):
     def project_node(self,
                      current_year,
                      current_month,
-                     network):
+                     network,
+                     biomass=None):
 
+        # Optional profiling.phase_profile timing each phase
+        profile = network.profile
         current_time_index = current_year * network.n_months + current_month
-        self.initialize_node(network, current_time_index)
-            
+        self.initialize_node(network, current_time_index, biomass)
+        if profile is not None:
+            profile.lap('kernel build')
+        rates = self.vital_rates(network)
+        if profile is not None:
+            profile.lap('vital rates')
+
         # Is it a node and spawning month?
         if self.Spawn and current_month in network.spawn_months:
             # Add new age_0 fish to next year
-            for grp in self.groups:
+            for grp, recruit in zip(self.groups, rates.recruit):
                 grp.age_0[current_year + 1] += (
                     grp.group_spawn(year=current_time_index,
                                     length_weight=self.length_weight,
                                     maturity_prob=self.maturity_prob,
-                                    omega=network.omega) *
+                                    omega=network.omega,
+                                    recruit=recruit) *
                     network.spawn_prob[current_year] *
                     network.egg_viability
                 )
+            if profile is not None:
+                profile.lap('spawning')
 
         # If it is the first month of the year, age_0 fish enter the population
-        add_in_month = 0
-        if current_month == add_in_month:
+        if current_month == self.age_0_month:
             new_at_node = 0.0
             # Add up new individuals in node
             for grp in self.groups:
                 new_at_node += grp.age_0[current_year]
                 grp.age_0[current_year] = 0.0
-            for grp in self.groups:
-                age_0_mean = self.vonB_function(1.0 / network.n_months)
-                age_0_dist_raw = stats.lognorm.pdf(network.omega,
-                                                   loc=0.0,
-                                                   scale=age_0_mean,
-                                                   s=grp.sigma_j)
-                if age_0_dist_raw.sum() > 0.0:
-                    age_0_dist = age_0_dist_raw/age_0_dist_raw.sum()
-                else:
-                    age_0_dist = np.zeros(len(age_0_dist_raw))
-
-                grp.population[:, current_time_index] += (
+            for grp, age_0_dist in zip(self.groups, rates.age_0_dist):
+                grp.population[:, grp.column(current_time_index)] += (
                     new_at_node * grp.ratio_at_birth * age_0_dist
                     )
+            if profile is not None:
+                profile.lap('age-0 recruitment')
 
         # Harvest code
         if (current_year >= self.harvest_start and
                 current_year <= self.harvest_end and
                 current_month in self.harvest_months):
-            harvest_level = self.harvest_level(network.omega)
+            harvest_level = rates.harvest
         else:
             harvest_level = 0.0
-        
-        survival_level = self.survival(network.omega)
-        
+
+        survival_level = rates.survival
+
         # project growth
         for grp in self.groups:
-            grp.population[:, current_time_index + 1] = np.dot(
-                self.projection_matrix,
-                grp.population[:, current_time_index]
-            ) * survival_level * (1.0 - harvest_level)
+            grown = (self.projection_matrix @
+                     grp.show_group_pop_dist(current_time_index))
+            if profile is not None:
+                profile.lap('growth matvec')
+            grp.population[:, grp.column(current_time_index + 1)] = \
+                grown * survival_level * (1.0 - harvest_level)
+            if profile is not None:
+                profile.lap('survival/harvest')
@@ -28,8 +28,9 @@ class populated_path(path):
     """
     def add_to_path(self, node, year, network):
         self.hold_groups = []
+        # Every group moves with the node's biomass before movement
+        biomass = node.calculate_node_biomass(year, network.omega)
         for grp in node.groups:
-            biomass = node.calculate_node_biomass(year, network.omega)
             migration = self.probability * (2 - np.exp(-node.g_migration * biomass))
             grp_temp = group.group_populated(grp.show_group_name())
             grp_temp.population = (grp.show_group_pop_dist(year) *
@@ -40,15 +41,17 @@ class populated_path(path):
         for path_grp in self.hold_groups:
             for node_grp in node.groups:
                 if path_grp.show_group_name() == node_grp.show_group_name():
-                    node_grp.population[:, year] += path_grp.population
+                    node_grp.population[:, node_grp.column(year)] += \
+                        path_grp.population
 
     def subtract_from_node(self, node, year):
         for path_grp in self.hold_groups:
             for node_grp in node.groups:
                 if path_grp.show_group_name() == node_grp.show_group_name():
                     # Next lines prevents negative (or zombie) fish
-                    if (node_grp.population[:, year] -
+                    column = node_grp.column(year)
+                    if (node_grp.population[:, column] -
                             path_grp.population).min() < 0:
-                        node_grp.population[:, year] *= 0.0
+                        node_grp.population[:, column] *= 0.0
                     else:
-                        node_grp.population[:, year] -= path_grp.population
+                        node_grp.population[:, column] -= path_grp.population
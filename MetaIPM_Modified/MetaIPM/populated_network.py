@@ -25,6 +25,7 @@ class populate_network_from_csv():
         self.network_data = network_data
         self.transition_data = transition_data
         self.transition_key_data = transition_key_data
+        self.node_data = node_data
         self.lw_data = lw_data
         self.maturity_data = maturity_data
         self.vonB_data = vonB_data
@@ -85,6 +86,8 @@ class populate_network_from_csv():
         """
 
         self.network.clear_nodes()
+        # draw from the parameters the overrides replaced
+        self.network.restore_parameter_defaults()
         # update spawning probs
         if self.stochastic_spawn:
             """
@@ -110,5 +113,26 @@ class populate_network_from_csv():
         for node_idx in self.network.nodes:
             node_idx.update_group_parameters(self.network)
 
+        self.network.apply_parameter_overrides()
+
     def show_network(self):
         return self.network
+
+    def input_data(self):
+        """
+        Return the inputs used to create the network.
+
+        The dictionary may be passed back to populate_network_from_csv,
+        for example to build copies of the network in other processes.
+        """
+        return {'network_data': self.network_data,
+                'transition_data': self.transition_data,
+                'transition_key_data': self.transition_key_data,
+                'node_data': self.node_data,
+                'group_data': self.group_data,
+                'lw_data': self.lw_data,
+                'vonB_data': self.vonB_data,
+                'vonB_sigma_data': self.vonB_sigma_data,
+                'maturity_data': self.maturity_data,
+                'stochastic_spawn': self.stochastic_spawn,
+                'stochastic_pars': self.stochastic_pars}
@@ -0,0 +1,87 @@
+import time
+
+
+class phase_profile:
+    """
+    Wall time and call counts of the phases of a projection.
+
+    The projection code marks the end of each phase with lap, which
+    adds the time since the previous lap (or start) to that phase.
+    Phases are therefore contiguous: every moment between start and
+    the last lap is counted once. With profiling off the network's
+    profile is None and the code skips the laps, so the cost is one
+    comparison per phase.
+
+    Times accumulate over projections until reset. Sizes of the arrays
+    holding the history are recorded by allocated.
+    """
+    def __init__(self, callback=None):
+        '''
+        Parameters
+        ----------
+        callback : callable or None
+            Called with the phase name and its elapsed seconds at every
+            lap, for example to stream timings to a logger.
+        '''
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        '''Forget all recorded times, counts and sizes.'''
+        self.seconds = {}
+        self.calls = {}
+        self.allocated_bytes = {}
+        self.last = None
+
+    def start(self):
+        '''Start timing the next phase.'''
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        '''End a phase that began at the previous lap or start.'''
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + elapsed
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.last = now
+        if self.callback is not None:
+            self.callback(phase, elapsed)
+
+    def allocated(self, name, array):
+        '''Record the size of an array, None for an unused one.'''
+        self.allocated_bytes[name] = 0 if array is None else array.nbytes
+
+    def report(self):
+        '''
+        Summary of the recorded phases.
+
+        Returns a dictionary with the phases, slowest first, each
+        giving its seconds, calls, mean seconds per call and fraction
+        of the profiled time, plus total_seconds and allocated_bytes.
+        '''
+        total = sum(self.seconds.values())
+        phases = {}
+        for phase in sorted(self.seconds, key=self.seconds.get,
+                            reverse=True):
+            phases[phase] = {
+                'seconds': self.seconds[phase],
+                'calls': self.calls[phase],
+                'mean_seconds': self.seconds[phase] / self.calls[phase],
+                'fraction': self.seconds[phase] / total if total else 0.0}
+        return {'phases': phases,
+                'total_seconds': total,
+                'allocated_bytes': dict(self.allocated_bytes)}
+
+    def __str__(self):
+        report = self.report()
+        lines = ["phase                   seconds     calls  mean (s)  "
+                 "share"]
+        for phase, entry in report['phases'].items():
+            lines.append("{:<22s}  {:>8.4f}  {:>8d}  {:.2e}  {:>5.1%}".format(
+                phase, entry['seconds'], entry['calls'],
+                entry['mean_seconds'], entry['fraction']))
+        lines.append("{:<22s}  {:>8.4f}".format('total',
+                                                 report['total_seconds']))
+        for name, n_bytes in report['allocated_bytes'].items():
+            lines.append("{:<22s}  {:>8.2f} MB".format(name, n_bytes / 1e6))
+        return "\n".join(lines)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from MetaIPM import stochastic_wrapper
+
+# Columns the model writes into its input tables while building nodes
+derived_columns = ['prob', 'pars']
+
+
+def hash_inputs(input_data, extra=None):
+    '''
+    Hash a network's resolved inputs.
+
+    Every table of input_data (see populate_network_from_csv.input_data)
+    is hashed by its column names, dtypes, index and values, along with
+    the stochastic flags and anything in extra. Columns the model
+    derives from the tables (derived_columns) are left out, so a
+    table hashes the same before and after a network is built from it.
+    '''
+    digest = hashlib.sha256()
+    for name in sorted(input_data):
+        digest.update(name.encode())
+        value = input_data[name]
+        if isinstance(value, pd.DataFrame):
+            table = value.drop(columns=[column for column in derived_columns
+                                        if column in value.columns])
+            digest.update(repr([(str(column), str(dtype)) for column, dtype
+                                in table.dtypes.items()]).encode())
+            digest.update(pd.util.hash_pandas_object(
+                table, index=True).values.tobytes())
+        else:
+            digest.update(repr(value).encode())
+    digest.update(repr(extra).encode())
+    return digest.hexdigest()
+
+
+class result_cache:
+    """
+    Content-addressed cache of projection outputs on disk.
+
+    Runs are keyed by a hash of the network's input tables, stochastic
+    flags, seed, engine and run settings: parameter overrides,
+    retention policy, dtype, kernel quantization and truncation and
+    convergence check. The retained populations (or node summaries) are stored
+    compressed in directory, one .npz file per run, with an index.json
+    recording their size and use. When the files exceed max_bytes the
+    least recently used runs are removed.
+
+    Runs with stochastic inputs are only cached when a seed is given.
+    The cache is meant for one process at a time.
+    """
+    def __init__(self, directory, max_bytes=None):
+        '''
+        Parameters
+        ----------
+        directory : str
+            Directory holding the cached runs. It is created if needed.
+        max_bytes : int or None
+            Largest total size of the cached files. None is unbounded.
+        '''
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(directory, 'index.json')
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+        self.evict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, network_creator, engine='object', seed=None):
+        '''
+        Hash identifying a run of the creator's network.
+
+        Besides the inputs, engine and seed, the key holds the
+        network's run settings (network.run_settings) except the
+        kernel cache size, which does not change the outputs.
+        '''
+        settings = network_creator.network.run_settings()
+        if settings['kernel_cache'] is not None:
+            settings['kernel_cache'] = settings['kernel_cache'][
+                'quantization']
+        settings['parameter_overrides'] = sorted(
+            (repr(key), repr(np.asarray(value).tolist())) for key, value in
+            settings['parameter_overrides'].items())
+        extra = dict(settings, engine=engine, seed=seed)
+        return hash_inputs(network_creator.input_data(),
+                           sorted(extra.items()))
+
+    def file_name(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def project(self, network_creator, engine='object', seed=None):
+        '''
+        Project the creator's network, or load the cached outputs.
+
+        The network's parameters are redrawn (new_stochastic_parameters)
+        after seeding the random state with
+        stochastic_wrapper.seed_iteration(seed, 0), then it is projected.
+        On a hit the network itself is not projected.
+
+        Returns
+        -------
+        Dictionary of arrays: 'population' and 'times' as returned by
+        network.retained_population, or 'node_totals', 'node_biomass'
+        and 'times' with the 'summary' retention policy.
+        '''
+        stochastic = (network_creator.stochastic_spawn or
+                      network_creator.stochastic_pars)
+        cacheable = seed is not None or not stochastic
+        if cacheable:
+            key = self.key(network_creator, engine, seed)
+            if key in self.index and os.path.exists(self.file_name(key)):
+                self.hits += 1
+                self.index[key]['last_used'] = time.time()
+                self.write_index()
+                with np.load(self.file_name(key)) as cached:
+                    return {name: cached[name] for name in cached.files}
+            self.misses += 1
+
+        if seed is not None:
+            stochastic_wrapper.seed_iteration(seed, 0)
+        network_creator.new_stochastic_parameters()
+        network = network_creator.network
+        network.project_network(engine=engine)
+        if network.history_retention.kind == 'summary':
+            outputs = {'node_totals': network.history.node_totals,
+                       'node_biomass': network.history.node_biomass,
+                       'times': np.arange(network.history.n_times)}
+        else:
+            population, times = network.retained_population()
+            outputs = {'population': population, 'times': times}
+        outputs = {name: np.array(value) for name, value in outputs.items()}
+
+        if cacheable:
+            self.store(key, outputs)
+        return outputs
+
+    def store(self, key, outputs):
+        '''Write a run's outputs and evict old runs if needed.'''
+        np.savez_compressed(self.file_name(key), **outputs)
+        now = time.time()
+        self.index[key] = {'bytes': os.path.getsize(self.file_name(key)),
+                           'created': now,
+                           'last_used': now}
+        self.evict()
+        self.write_index()
+
+    def evict(self):
+        '''Remove least recently used runs until within max_bytes.'''
+        if self.max_bytes is None or self.total_bytes() <= self.max_bytes:
+            return
+        by_use = sorted(self.index, key=lambda key:
+                        self.index[key]['last_used'])
+        while self.total_bytes() > self.max_bytes and by_use:
+            self.remove(by_use.pop(0))
+        self.write_index()
+
+    def remove(self, key):
+        if os.path.exists(self.file_name(key)):
+            os.remove(self.file_name(key))
+        del self.index[key]
+
+    def write_index(self):
+        with open(self.index_file, 'w') as f:
+            json.dump(self.index, f, indent=1)
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.index.values())
+
+    def entries(self):
+        '''DataFrame of cached runs: key, bytes, created and last_used.'''
+        return pd.DataFrame(
+            [dict(key=key, **entry) for key, entry in self.index.items()],
+            columns=['key', 'bytes', 'created', 'last_used'])
+
+    def stats(self):
+        '''Hits and misses of this session, and the cache's size.'''
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.index),
+                'bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes}
+
+    def clear(self):
+        '''Remove every cached run.'''
+        for key in list(self.index):
+            self.remove(key)
+        self.write_index()
@@ -0,0 +1,131 @@
+import numpy as np
+from MetaIPM import workers
+
+
+def yearly_node_totals(network):
+    '''
+    Population of each node at the start of each year.
+
+    Returns an (nodes, n_years) array of totals in the first month of
+    years 0 to n_years - 1. The network must retain those time steps.
+    '''
+    population, times = network.retained_population()
+    year_starts = np.arange(network.n_years) * network.n_months
+    columns = np.searchsorted(times, year_starts)
+    if not np.array_equal(times[np.minimum(columns, len(times) - 1)],
+                          year_starts):
+        raise ValueError("The network's retention policy does not keep "
+                         "the start of each year")
+    return population[..., columns].sum(axis=2).sum(axis=1)
+
+
+def parameter_keys(key):
+    '''
+    The override keys of a spec's key, which may be a tuple of keys
+    that are all set to the same value (see sweep.expand_grid).
+    '''
+    return key if isinstance(key[0], tuple) else (key,)
+
+
+def _run_perturbed(task):
+    '''Perturb, project and total the worker's network.'''
+    index, key, value, engine = task
+    network = workers.creator.network
+    if network.history_retention.kind != 'year_starts':
+        network.set_history_retention('year_starts')
+    earlier = workers.set_overrides(
+        network, {key_idx: value for key_idx in parameter_keys(key)})
+    network.clear_nodes()
+    network.project_network(engine=engine)
+    workers.restore_overrides(network, earlier)
+    return index, yearly_node_totals(network)
+
+
+class sensitivity_analysis:
+    """
+    Central-difference sensitivities of yearly growth rates.
+
+    Each spec is a tuple (key, values, delta), where key names a
+    parameter as in network_populated_paths.set_parameter_override:
+    ('node', node_name, name), ('path', start, end) or
+    ('network', name). For every value in values the parameter is set
+    to value * (1 - delta) and value * (1 + delta), the network is
+    projected, and the sensitivity of each node's growth rate
+    lambda_t = N_{t+1} / N_t is
+
+        (lambda_upper - lambda_lower) / (2 * delta * value)
+
+    where N_t is the node total at the start of year t. All perturbed
+    runs of all specs are scheduled together across a process pool.
+    Each worker builds the template network once, with its settings
+    and overrides (see workers.map_tasks), and applies every
+    perturbation in place on top of them, restoring the parameter
+    afterwards.
+    """
+    def __init__(self, network_creator, specs):
+        '''
+        Parameters
+        ----------
+        network_creator : populated_network.populate_network_from_csv
+            Template network. Use a deterministic creator
+            (stochastic_spawn and stochastic_pars False).
+        specs : list
+            (key, values, delta) tuples. key may be a tuple of keys,
+            which are all set to the same value, for example the
+            harvest_max of every node.
+        '''
+        self.network_creator = network_creator
+        self.specs = [(key, list(values), delta)
+                      for key, values, delta in specs]
+        self.nodes = [nd.show_node_name()
+                      for nd in network_creator.network.nodes]
+
+    def tasks(self, engine='object'):
+        '''Perturbed runs, keyed by (spec, value, side) indices.'''
+        tasks = []
+        for spec_index, (key, values, delta) in enumerate(self.specs):
+            for value_index, value in enumerate(values):
+                for side, sign in enumerate([-1, 1]):
+                    tasks.append(((spec_index, value_index, side), key,
+                                  value * (1 + sign * delta), engine))
+        return tasks
+
+    def run(self, n_workers=None, engine='object'):
+        '''
+        Run all perturbed projections.
+
+        Parameters
+        ----------
+        n_workers : int or None
+            Number of processes. None uses all CPUs and 1 runs the
+            projections in this process.
+        engine : str
+            Projection engine passed to project_network.
+
+        Returns
+        -------
+        List with one array per spec, shaped
+        (values, nodes, n_years - 1), of the sensitivity of each
+        node's growth rate in each year. Also kept in
+        self.sensitivities, with the lower and upper growth rates in
+        self.lower and self.upper.
+        '''
+        totals = dict(workers.map_tasks(_run_perturbed, self.tasks(engine),
+                                        self.network_creator, n_workers))
+
+        self.lower = []
+        self.upper = []
+        self.sensitivities = []
+        for spec_index, (key, values, delta) in enumerate(self.specs):
+            growth = np.array([[
+                totals[spec_index, value_index, side][:, 1:] /
+                totals[spec_index, value_index, side][:, :-1]
+                for side in range(2)]
+                for value_index in range(len(values))])
+            value_scale = 2 * delta * np.array(values, dtype=float)
+            self.lower.append(growth[:, 0])
+            self.upper.append(growth[:, 1])
+            self.sensitivities.append(
+                (growth[:, 1] - growth[:, 0]) /
+                value_scale[:, np.newaxis, np.newaxis])
+        return self.sensitivities
@@ -1,6 +1,36 @@
 import pandas as pd
 import numpy as np
 from MetaIPM import summarize_outputs as so
+from MetaIPM import workers
+
+
+def seed_iteration(seed, stoch_index):
+    '''
+    Seed numpy's global random state for one stochastic iteration.
+
+    Each iteration gets its own stream spawned from the master seed,
+    so results do not depend on which process runs the iteration.
+    '''
+    seed_sequence = np.random.SeedSequence(seed, spawn_key=(stoch_index,))
+    np.random.seed(seed_sequence.generate_state(4))
+
+
+def _run_iteration(task):
+    '''
+    Draw parameters, project and return the retained populations, or
+    the node summaries with the 'summary' retention policy.
+    '''
+    stoch_index, seed, engine = task
+    seed_iteration(seed, stoch_index)
+    workers.creator.new_stochastic_parameters()
+    network = workers.creator.network
+    network.project_network(engine=engine)
+    if network.history_retention.kind == 'summary':
+        return stoch_index, {
+            'node_totals': np.array(network.history.node_totals),
+            'node_biomass': np.array(network.history.node_biomass)}
+    population, times = network.retained_population()
+    return stoch_index, {'population': population.copy()}
 
 
 class stochastic_model():
@@ -13,6 +43,7 @@ class stochastic_model():
         self.counting_index_base = 0
 
     def run_stochastic(self, n_iter):
+        populations = [self.population]
         for i in range(n_iter):
             print("Running stochastic iteration ",
                   str(self.counting_index_base))
@@ -32,8 +63,79 @@ class stochastic_model():
                  out.reset_index(drop=True)], axis=1, sort=False)
 
             # Save population and update look index
-            self.population = self.population.append(out_with_index)
+            populations.append(out_with_index)
             self.counting_index_base += 1
+        self.population = pd.concat(populations)
+
+    def run_stochastic_parallel(self, n_iter, n_workers=None, seed=None,
+                                engine='object'):
+        '''
+        Run stochastic iterations across a pool of processes.
+
+        Each worker builds its own copy of the network once, with the
+        network's retention policy, dtype, kernel and convergence
+        settings and parameter overrides (see workers.map_tasks), and
+        then resets and redraws it for every iteration. The outputs are
+        returned in memory, not written to the network's run directory.
+        Iteration i uses a random stream spawned from the master seed,
+        so a seed gives the same ensemble for any number of workers.
+
+        Parameters
+        ----------
+        n_iter : int
+            Number of stochastic iterations.
+        n_workers : int or None
+            Number of processes. None uses all CPUs and 1 runs the
+            iterations in this process.
+        seed : int or None
+            Master seed. None draws one, stored in self.seed.
+        engine : str
+            Projection engine passed to project_network.
+
+        Returns
+        -------
+        Array of populations shaped
+        (iterations, nodes, groups, n_points, times), holding the time
+        steps kept by the network's retention policy. The array is also
+        appended to self.ensemble, with the iterations' stoch_index
+        values in self.ensemble_index. With the 'summary' policy None
+        is returned and the node totals and biomass, shaped
+        (iterations, nodes, times), are appended to
+        self.ensemble_totals and self.ensemble_biomass instead.
+        '''
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
+
+        tasks = [(self.counting_index_base + i, seed, engine)
+                 for i in range(n_iter)]
+        results = workers.map_tasks(_run_iteration, tasks,
+                                    self.network_creator, n_workers)
+
+        stoch_index = np.array([index for index, _ in results])
+        outputs = {name: np.stack([output[name] for _, output in results])
+                   for name in results[0][1]}
+
+        network = self.network_creator.network
+        self.ensemble_nodes = [nd.show_node_name() for nd in network.nodes]
+        self.ensemble_groups = network.collect_group_names()
+        if hasattr(self, 'ensemble_index'):
+            self.ensemble_index = np.concatenate([self.ensemble_index,
+                                                  stoch_index])
+        else:
+            self.ensemble_index = stoch_index
+        for name, attribute in [('population', 'ensemble'),
+                                ('node_totals', 'ensemble_totals'),
+                                ('node_biomass', 'ensemble_biomass')]:
+            if name not in outputs:
+                continue
+            if hasattr(self, attribute):
+                setattr(self, attribute, np.concatenate(
+                    [getattr(self, attribute), outputs[name]]))
+            else:
+                setattr(self, attribute, outputs[name])
+        self.counting_index_base += n_iter
+        return outputs.get('population')
 
     def return_population(self):
         return self.population
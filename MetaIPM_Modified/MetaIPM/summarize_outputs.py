@@ -1,40 +1,146 @@
 import pandas as pd
 import numpy as np
 import seaborn as sns
+from MetaIPM import history
 
 sns.set(style="white", rc={"axes.facecolor": (0, 0, 0, 0)})
 pal = sns.cubehelix_palette(12, rot=-.25, light=.7)
 
 
+class population_history:
+    """
+    Population history of a network as one array.
+
+    values has shape (node, group, time, length) and the coordinates
+    are kept alongside: node and group names, the time index, year and
+    month of each retained time, and the length mesh. Groups are
+    aligned by name across nodes; present marks the (node, group)
+    pairs that exist.
+    """
+    def __init__(self, values, nodes, groups, present, pairs,
+                 times, years, months, lengths, weights):
+        self.values = values
+        self.times = times
+        self.nodes = nodes
+        self.groups = groups
+        self.present = present
+        self.pairs = pairs
+        self.years = years
+        self.months = months
+        self.lengths = lengths
+        self.weights = weights
+
+    def node_totals(self):
+        '''Total population of each node at each time, (node, time).'''
+        return self.values.sum(axis=-1).sum(axis=1)
+
+    def group_totals(self):
+        '''Total population of each group at each time.'''
+        return self.values.sum(axis=-1)
+
+    def biomass(self):
+        '''Biomass of each node at each time, (node, time).'''
+        return np.einsum('ngtl,nl->nt', self.values, self.weights)
+
+    def iter_long(self):
+        '''
+        Lazily generate long-format DataFrames, one per node and group.
+
+        Each DataFrame has the Year, Month, Node, Group, Length and
+        Population columns of extract_all_populations.
+        '''
+        n_times = len(self.years)
+        n_lengths = len(self.lengths)
+        for node_index, group_index in self.pairs:
+            yield pd.DataFrame(
+                {"Year": np.tile(self.years, n_lengths),
+                 "Month": np.tile(self.months, n_lengths),
+                 "Node": np.repeat(self.nodes[node_index],
+                                   n_times * n_lengths),
+                 "Group": np.repeat(self.groups[group_index],
+                                    n_times * n_lengths),
+                 "Length": np.repeat(self.lengths, n_times),
+                 "Population":
+                     self.values[node_index, group_index].T.ravel()})
+
+    def to_long(self):
+        '''Long-format DataFrame of all nodes and groups.'''
+        return pd.concat(list(self.iter_long()))
+
+
+def extract_population_array(network_in):
+    '''
+    Extract group-level populations into a population_history.
+
+    The history is copied into one preallocated
+    (node, group, time, length) array, so later runs of the network
+    do not change it. Only the time steps kept by the network's
+    retention policy are included.
+    '''
+    if not hasattr(network_in, 'history'):
+        network_in.stack_populations()
+    tensor, time = network_in.retained_population()
+    values = np.empty(tensor.shape[:2] + tensor.shape[3:] + tensor.shape[2:3])
+    values[...] = np.moveaxis(tensor, -1, 2)
+
+    pairs = [(node_index, network_in.group_names.index(
+                 group.show_group_name()))
+             for node_index, node in enumerate(network_in.nodes)
+             for group in node.groups]
+    weights = np.stack([node.length_weight(network_in.omega)
+                        for node in network_in.nodes])
+
+    return population_history(
+        values=values,
+        nodes=[node.show_node_name() for node in network_in.nodes],
+        groups=list(network_in.group_names),
+        present=network_in.group_present.copy(),
+        pairs=pairs,
+        times=time,
+        years=time // network_in.n_months,
+        months=time % network_in.n_months,
+        lengths=network_in.omega.copy(),
+        weights=weights)
+
+
+def open_population_history(directory, member=None):
+    '''
+    Open a run directory as a population_history without re-running.
+
+    The populations are memory-mapped read-only and viewed in
+    (node, group, time, length) order without copying, except for the
+    'window' policy, whose ring is put back in time order. Ensemble
+    runs hold a members axis; member selects one of them.
+    '''
+    metadata, arrays = history.open_run(directory)
+    if 'population' not in arrays:
+        raise ValueError("The run directory holds only node summaries")
+    population = arrays['population']
+    if metadata['dims'][0] == 'member':
+        if member is None:
+            raise ValueError("member is required for ensemble runs")
+        population = population[member]
+
+    columns = np.array(metadata['columns'], dtype=int)
+    if not np.array_equal(columns, np.arange(population.shape[-1])):
+        population = population[..., columns]
+    times = np.array(metadata['times'], dtype=int)
+
+    return population_history(
+        values=np.moveaxis(population, -1, 2),
+        nodes=metadata['nodes'],
+        groups=metadata['groups'],
+        present=np.array(metadata['present'], dtype=bool),
+        pairs=[tuple(pair) for pair in metadata['pairs']],
+        times=times,
+        years=times // metadata['n_months'],
+        months=times % metadata['n_months'],
+        lengths=np.array(metadata['omega']),
+        weights=np.array(metadata['weights']))
+
+
 def extract_all_populations(network_in):
     '''
     Extract out group-level data and summarize at network-level.
     '''
-    data_out = pd.DataFrame()
-
-    year_month = pd.DataFrame(
-        {"Year": np.repeat(range(network_in.n_years + 1),
-                           network_in.n_months),
-         "Month": np.tile(range(network_in.n_months),
-                          network_in.n_years + 1)}
-    )
-
-    for node in network_in.nodes:
-        for group in node.groups:
-            pop_raw = pd.DataFrame(group.population.transpose())
-            pop_raw.columns = network_in.omega
-            node_group = pd.DataFrame(
-                {"Node": np.repeat(node.show_node_name(),
-                                   (network_in.n_years + 1) *
-                                   network_in.n_months),
-                 "Group": np.repeat(group.show_group_name(),
-                                    (network_in.n_years + 1) *
-                                    network_in.n_months)}
-            )
-            pop_year_mo = pd.concat(
-                [pop_raw, year_month, node_group],
-                axis=1).melt(id_vars=['Year', 'Month', 'Node', 'Group'],
-                             var_name="Length",
-                             value_name="Population")
-            data_out = data_out.append(pop_year_mo)
-    return data_out
+    return extract_population_array(network_in).to_long()
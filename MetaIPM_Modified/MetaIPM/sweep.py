@@ -0,0 +1,164 @@
+import itertools
+import numpy as np
+import pandas as pd
+from MetaIPM import workers
+
+
+def parameter_column(key):
+    '''
+    Column name of a parameter in the result table.
+
+    ('node', 'a', 'harvest_max') becomes 'harvest_max_a',
+    ('path', 'a', 'b') becomes 'probability_a_b' and
+    ('network', 'egg_viability') becomes 'egg_viability'.
+    '''
+    if key[0] == 'node':
+        return key[2] + '_' + str(key[1])
+    elif key[0] == 'path':
+        return 'probability_' + str(key[1]) + '_' + str(key[2])
+    elif key[0] == 'network':
+        return key[1]
+    raise ValueError("Unknown parameter kind " + str(key[0]))
+
+
+def expand_grid(grid):
+    '''
+    Expand a grid into one dictionary of overrides per run.
+
+    grid maps parameter keys to lists of values and runs are every
+    combination of them. A key may be a tuple of keys, which are all
+    set to the same value, for example
+    {(('node', 'a', 'harvest_max'), ('node', 'b', 'harvest_max')):
+    [0, 0.4, 0.8]}.
+    '''
+    axes = list(grid.keys())
+    runs = []
+    for values in itertools.product(*[grid[axis] for axis in axes]):
+        overrides = {}
+        for axis, value in zip(axes, values):
+            keys = axis if isinstance(axis[0], tuple) else (axis,)
+            for key in keys:
+                overrides[key] = value
+        runs.append(overrides)
+    return runs
+
+
+def _run_scenario(task):
+    '''Override, project and summarize the worker's network.'''
+    run_index, overrides, engine, convergence = task
+    network = workers.creator.network
+    if network.history_retention.kind != 'summary':
+        network.set_history_retention('summary')
+    if convergence is not None:
+        network.set_convergence_check(**convergence)
+    earlier = workers.set_overrides(network, overrides)
+    network.clear_nodes()
+    network.project_network(engine=engine)
+    workers.restore_overrides(network, earlier)
+
+    year_starts = np.arange(network.n_years + 1) * network.n_months
+    return (run_index,
+            network.history.node_totals[:, year_starts].copy(),
+            network.history.node_biomass[:, year_starts].copy())
+
+
+class scenario_sweep:
+    """
+    Run a network over a grid of parameter overrides.
+
+    Parameters are named by the keys of
+    network_populated_paths.set_parameter_override:
+    ('node', node_name, name), ('path', start, end) and
+    ('network', name). Each worker process builds the network once and
+    applies every run's overrides in place (see set_node_parameter), so
+    the model tables are not re-parsed for each scenario. Runs keep the
+    template network's dtype, kernel settings and overrides, with their
+    own overrides on top; their history is kept as a summary.
+    """
+    def __init__(self, network_creator, grid=None, runs=None):
+        '''
+        Parameters
+        ----------
+        network_creator : populated_network.populate_network_from_csv
+            Template network. Use a deterministic creator
+            (stochastic_spawn and stochastic_pars False).
+        grid : dict or None
+            Parameter keys and their values, expanded with expand_grid.
+        runs : list or None
+            Further runs, each a dictionary of parameter keys and
+            values, for scenarios that are not a grid, such as scaling
+            two path probabilities together.
+        '''
+        self.network_creator = network_creator
+        self.runs = []
+        if grid is not None:
+            self.runs += expand_grid(grid)
+        if runs is not None:
+            self.runs += [dict(overrides) for overrides in runs]
+
+    def parameter_keys(self):
+        '''All parameter keys set by any run, in order of appearance.'''
+        keys = []
+        for overrides in self.runs:
+            for key in overrides:
+                if key not in keys:
+                    keys.append(key)
+        return keys
+
+    def run(self, n_workers=None, engine='object', convergence=None):
+        '''
+        Project every run.
+
+        Parameters
+        ----------
+        n_workers : int or None
+            Number of processes. None uses all CPUs and 1 runs the
+            scenarios in this process.
+        engine : str
+            Projection engine passed to project_network.
+        convergence : dict or None
+            Arguments of network.set_convergence_check, to stop each
+            run once its populations settle, for example
+            {'tolerance': 1e-8}. The rest of each run is filled with
+            its settled state, so fill must not be False. None keeps
+            the template network's convergence check.
+
+        Returns
+        -------
+        Tidy DataFrame with one row per run, node and year: the run
+        index, a column per parameter (see parameter_column), Node,
+        Year, Population and Biomass at the start of each year. Also
+        kept in self.results.
+        '''
+        if convergence is None:
+            rule = self.network_creator.network.convergence_check
+            fill = rule is None or rule.fill
+        else:
+            fill = convergence.get('fill', True)
+        if not fill:
+            raise ValueError("Sweeps need the rest of stopped runs filled")
+        tasks = [(run_index, overrides, engine, convergence)
+                 for run_index, overrides in enumerate(self.runs)]
+        results = workers.map_tasks(_run_scenario, tasks,
+                                    self.network_creator, n_workers)
+
+        network = self.network_creator.network
+        nodes = [nd.show_node_name() for nd in network.nodes]
+        n_years = network.n_years + 1
+        n_rows = len(nodes) * n_years
+        keys = self.parameter_keys()
+
+        totals = np.concatenate([total.ravel() for _, total, _ in results])
+        biomass = np.concatenate([mass.ravel() for _, _, mass in results])
+        run_index = np.repeat([index for index, _, _ in results], n_rows)
+        table = {'run': run_index}
+        for key in keys:
+            table[parameter_column(key)] = np.repeat(
+                [self.runs[index].get(key, np.nan)
+                 for index, _, _ in results], n_rows)
+        table['Node'] = np.tile(np.repeat(nodes, n_years), len(results))
+        table['Year'] = np.tile(np.arange(n_years), len(nodes) * len(results))
+        table['Population'] = totals
+        table['Biomass'] = biomass
+        self.results = pd.DataFrame(table)
+        return self.results
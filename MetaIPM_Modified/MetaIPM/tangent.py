@@ -0,0 +1,101 @@
+import numpy as np
+from MetaIPM import tensor_projection
+
+# Imaginary step, relative to the parameter's size
+complex_step = 1e-20
+
+
+class tangent_projection:
+    """
+    Forward-mode sensitivities of a network projection.
+
+    Derivatives of the population state with respect to a set of
+    parameters are propagated alongside the state in one batched run
+    of the tensor engine. Member p of the batch carries parameter p
+    with an imaginary step i*h_p (complex-step differentiation), so the
+    imaginary part of every quantity is h_p times its tangent-linear
+    derivative. There is no subtraction of nearly equal runs, and the
+    derivatives are exact to rounding even for tiny parameters such
+    as g_length and g_migration.
+
+    Parameters are named by the keys of
+    network_populated_paths.set_parameter_override: ('node', node_name,
+    name), ('path', start, end) or ('network', name). A parameter may be
+    a tuple of keys that move together, such as a hyper-parameter
+    shared by all nodes. Node parameters from the vonB table are per
+    month (see node_populated.set_parameter). Only continuous
+    parameters can be differentiated; where the zombie-fish clamp zeroes
+    a group, its derivative is zero as well.
+    """
+    def __init__(self, network, parameters):
+        '''
+        Parameters
+        ----------
+        network : network.network_populated_paths
+            Built network to differentiate.
+        parameters : list
+            Parameter keys, or tuples of keys, to differentiate by.
+        '''
+        self.network = network
+        self.parameters = [keys if isinstance(keys[0], tuple) else (keys,)
+                           for keys in parameters]
+
+    def project(self):
+        '''
+        Project the state and its derivatives through all time steps.
+
+        Sets population (nodes, groups, n_points, times), node_totals
+        and node_biomass (nodes, times), and their derivatives with a
+        leading parameters axis: population_derivative,
+        node_totals_derivative and node_biomass_derivative. growth_rate
+        (nodes, n_years - 1) is the yearly growth rate N_{t+1} / N_t of
+        node totals at the start of each year, as in
+        sensitivity.sensitivity_analysis, and lambda_sensitivity holds
+        its derivatives (parameters, nodes, n_years - 1).
+        '''
+        network = self.network
+        members = []
+        steps = []
+        for keys in self.parameters:
+            values = [network.parameter_value(key) for key in keys]
+            size = max(np.max(np.abs(value)) for value in values)
+            step = complex_step * size if size > 0 else complex_step
+            try:
+                for key, value in zip(keys, values):
+                    network.apply_parameter(key, value + 1j * step)
+                members.append(tensor_projection.network_tensor(
+                    network, dtype=np.complex128))
+            finally:
+                for key, value in zip(keys, values):
+                    network.apply_parameter(key, value)
+            steps.append(step)
+        steps = np.array(steps)
+        batched = tensor_projection.network_tensor.batch(members)
+
+        n_times = network.n_years * network.n_months + 1
+        history = np.zeros(batched.initial_population.shape + (n_times,),
+                           dtype=np.complex128)
+        history[..., 0] = batched.initial_population
+        age_0 = np.zeros(batched.ratio_at_birth.shape +
+                         (network.n_years + 1,), dtype=np.complex128)
+        batched.project(history, age_0)
+
+        node_totals = history.sum(axis=-2).sum(axis=-2)
+        node_biomass = np.einsum('pngzt,pnz->pnt', history, batched.weights)
+        year_starts = np.arange(network.n_years) * network.n_months
+        yearly = node_totals[..., year_starts]
+        growth_rate = yearly[..., 1:] / yearly[..., :-1]
+
+        def derivative(values):
+            return values.imag / steps.reshape(
+                (-1,) + (1,) * (values.ndim - 1))
+
+        self.population = history[0].real
+        self.population_derivative = derivative(history)
+        self.node_totals = node_totals[0].real
+        self.node_totals_derivative = derivative(node_totals)
+        self.node_biomass = node_biomass[0].real
+        self.node_biomass_derivative = derivative(node_biomass)
+        self.growth_rate = growth_rate[0].real
+        self.lambda_sensitivity = derivative(growth_rate)
+        return self.lambda_sensitivity
@@ -0,0 +1,306 @@
+import numpy as np
+from MetaIPM import movement
+from MetaIPM.mesh import lognorm_cdf, lognorm_pdf
+from MetaIPM.node import banded_growth_kernel, growth_kernel, node_populated
+
+
+class network_tensor:
+    """
+    Batched projection engine for populated networks.
+
+    The metapopulation is held as one array shaped
+    (nodes, groups, n_points) and each month is advanced with stacked
+    per-node kernels, survival and harvest vectors. The parameters are
+    a snapshot of the network when the engine is created, held in the
+    network's dtype.
+
+    Engines for networks with the same nodes, groups and paths can be
+    combined with batch. Every array then gains a leading members axis,
+    so many parameter sets are projected in one pass.
+    """
+    # Per-node or per-member arrays stacked by batch
+    batched_arrays = ['vonB_K', 'vonB_Linf', 'vonB_sigma_k', 'g_length',
+                      'weights', 'survival', 'harvest', 'harvest_active',
+                      'spawn', 'recruit', 'age_0_dist', 'ratio_at_birth',
+                      'spawn_prob', 'egg_viability', 'initial_population']
+    # Optional profiling.phase_profile, set by network.project_network
+    profile = None
+
+    def __init__(self, network, dtype=None):
+        '''
+        Collect the network's parameters into stacked arrays.
+
+        dtype overrides the network's dtype, for example np.complex128
+        for complex-step derivatives.
+        '''
+        network.stack_populations()
+        nodes = network.nodes
+        omega = network.omega
+
+        self.omega = omega
+        self.kernel_weights = network.mesh.kernel_weights
+        self.kernel_edges = network.mesh.kernel_edges
+        self.kernel_tolerance = network.kernel_tolerance
+        self.kernel_max_fill = network.kernel_max_fill
+        self.dtype = np.dtype(network.dtype if dtype is None else dtype)
+        # Age-0 counts are kept in at least double precision
+        count_dtype = np.result_type(self.dtype, np.float64)
+        self.n_years = network.n_years
+        self.n_months = network.n_months
+        self.spawn_months = network.spawn_months
+        self.spawn_prob = np.asarray(network.spawn_prob, dtype=count_dtype)
+        self.egg_viability = np.asarray(network.egg_viability,
+                                        dtype=count_dtype)
+        self.initial_population = \
+            network.population_tensor[:, :, :, 0].astype(self.dtype)
+
+        self.vonB_K = np.array([nd.vonB_K for nd in nodes])
+        self.vonB_Linf = np.array([nd.vonB_Linf for nd in nodes])
+        self.vonB_sigma_k = np.array([nd.vonB_sigma_k for nd in nodes])
+        self.g_length = np.array([nd.g_length for nd in nodes])
+        self.weights = np.stack([nd.length_weight(omega) for nd in nodes]
+                                ).astype(self.dtype)
+        self.survival = np.stack([nd.survival(omega) for nd in nodes]
+                                 ).astype(self.dtype)
+        self.harvest = np.stack([nd.harvest_level(omega) for nd in nodes]
+                                ).astype(self.dtype)
+        self.spawn = np.array([bool(nd.Spawn) for nd in nodes])
+
+        # Whether each node harvests in each year and month
+        years = np.arange(self.n_years)[:, np.newaxis]
+        months = np.arange(self.n_months)[np.newaxis, :]
+        self.harvest_active = np.stack([
+            (years >= nd.harvest_start) & (years <= nd.harvest_end) &
+            np.isin(months, nd.harvest_months)
+            for nd in nodes])
+
+        n_nodes, n_groups = network.group_present.shape
+        self.recruit = np.zeros((n_nodes, n_groups, network.n_points),
+                                dtype=self.dtype)
+        self.age_0_dist = np.zeros((n_nodes, n_groups, network.n_points),
+                                   dtype=self.dtype)
+        self.ratio_at_birth = np.zeros((n_nodes, n_groups))
+        for node_index, nd in enumerate(nodes):
+            age_0_mean = nd.vonB_function(1.0 / network.n_months)
+            for grp in nd.groups:
+                group_index = network.group_names.index(
+                    grp.show_group_name())
+                if grp.produce_eggs:
+                    self.recruit[node_index, group_index] = grp.recruit(
+                        nd.length_weight(omega))
+                age_0_dist_raw = network.mesh.masses(
+                    lambda z: lognorm_pdf(z, s=grp.sigma_j,
+                                          scale=age_0_mean),
+                    lambda z: lognorm_cdf(z, s=grp.sigma_j,
+                                          scale=age_0_mean))
+                if age_0_dist_raw.sum().real > 0.0:
+                    self.age_0_dist[node_index, group_index] = (
+                        age_0_dist_raw / age_0_dist_raw.sum())
+                self.ratio_at_birth[node_index, group_index] = \
+                    grp.ratio_at_birth
+
+        self.movement = movement.movement_operator(network, self.dtype)
+
+    @classmethod
+    def batch(cls, tensors):
+        '''
+        Combine engines of identically structured networks.
+
+        The returned engine projects populations shaped
+        (members, nodes, groups, n_points).
+        '''
+        first = tensors[0]
+        for tensor in tensors[1:]:
+            if (tensor.initial_population.shape !=
+                    first.initial_population.shape or
+                    tensor.harvest_active.shape != first.harvest_active.shape
+                    or list(tensor.spawn_months) != list(first.spawn_months)
+                    or not np.array_equal(tensor.omega, first.omega)
+                    or (tensor.kernel_weights is None) !=
+                    (first.kernel_weights is None)
+                    or (tensor.kernel_edges is None) !=
+                    (first.kernel_edges is None)
+                    or tensor.dtype != first.dtype):
+                raise ValueError("Batched networks must share their nodes, "
+                                 "groups, mesh, time steps and dtype")
+        batched = cls.__new__(cls)
+        batched.omega = first.omega
+        batched.kernel_weights = first.kernel_weights
+        batched.kernel_edges = first.kernel_edges
+        batched.kernel_tolerance = None
+        batched.dtype = first.dtype
+        batched.n_years = first.n_years
+        batched.n_months = first.n_months
+        batched.spawn_months = first.spawn_months
+        for name in cls.batched_arrays:
+            setattr(batched, name,
+                    np.stack([getattr(tensor, name) for tensor in tensors]))
+        batched.movement = movement.movement_operator.batch(
+            [tensor.movement for tensor in tensors])
+        return batched
+
+    def biomass(self, population):
+        '''Biomass of each node for a (nodes, groups, n_points) state.'''
+        return (population *
+                self.weights[..., np.newaxis, :]).sum(-1).sum(-1)
+
+    def kernel_locations(self, population, biomass=None):
+        '''
+        Expected next length of each node and current length.
+
+        biomass is the state's node biomass if already computed.
+        '''
+        if biomass is None:
+            biomass = self.biomass(population)
+        shift = np.exp(-1 * self.g_length * biomass)
+        return (self.vonB_K[..., np.newaxis] * self.omega +
+                ((1 - self.vonB_K) * self.vonB_Linf)[..., np.newaxis]) * \
+            shift[..., np.newaxis]
+
+    def kernels(self, population, biomass=None):
+        '''Stacked (nodes, n_points, n_points) growth kernels.'''
+        location = self.kernel_locations(population, biomass)
+        return growth_kernel(self.omega, location, self.vonB_sigma_k,
+                             self.dtype, self.kernel_weights,
+                             self.kernel_edges)
+
+    def projection_kernels(self, population, biomass=None):
+        '''
+        Growth kernels used to project a (nodes, groups, n_points) state.
+
+        With the network's kernel truncation (set_kernel_truncation)
+        this is a list of per-node banded kernels, otherwise the dense
+        stack from kernels. Batched engines always use the dense stack.
+        '''
+        if self.kernel_tolerance is None or population.ndim != 3:
+            return self.kernels(population, biomass)
+        location = self.kernel_locations(population, biomass)
+        return [banded_growth_kernel(self.omega, location[node_index],
+                                     self.vonB_sigma_k[node_index],
+                                     self.kernel_tolerance, self.dtype,
+                                     self.kernel_weights, self.kernel_edges,
+                                     self.kernel_max_fill)
+                for node_index in range(len(location))]
+
+    def grow(self, kernels, population):
+        '''Apply projection_kernels to a (..., groups, n_points) state.'''
+        if isinstance(kernels, np.ndarray):
+            return np.matmul(kernels,
+                             population.swapaxes(-1, -2)).swapaxes(-1, -2)
+        return np.stack([kernel @ population[node_index].T
+                         for node_index, kernel in enumerate(kernels)]
+                        ).swapaxes(-1, -2)
+
+    def harvest_level(self, year, month):
+        '''Stacked harvest vectors for a year and month.'''
+        return np.where(self.harvest_active[..., year, month, np.newaxis],
+                        self.harvest, 0.0)
+
+    def project_month(self, population, age_0, year, month):
+        '''
+        Advance a (nodes, groups, n_points) state by one month.
+
+        The state is updated in place with spawning, age-0 recruits and
+        movement, which is the value recorded for this month. age_0,
+        shaped (nodes, groups, n_years + 1), collects spawned eggs. The
+        state for the next month is returned.
+        '''
+        profile = self.profile
+        # Node biomass is shared by growth and, unless age-0 recruits
+        # change the state, by movement
+        biomass = self.biomass(population)
+        if profile is not None:
+            profile.lap('node state')
+        projection_matrix = self.projection_kernels(population, biomass)
+        if profile is not None:
+            profile.lap('kernel build')
+
+        if month in self.spawn_months:
+            eggs = (self.recruit * population).sum(-1)
+            age_0[..., year + 1] += np.where(
+                self.spawn[..., np.newaxis],
+                eggs *
+                self.spawn_prob[..., year, np.newaxis, np.newaxis] *
+                self.egg_viability[..., np.newaxis, np.newaxis],
+                0.0)
+            if profile is not None:
+                profile.lap('spawning')
+
+        if month == node_populated.age_0_month:
+            new_at_node = age_0[..., year].sum(-1)
+            age_0[..., year] = 0.0
+            population += (
+                (new_at_node[..., np.newaxis] * self.ratio_at_birth)
+                [..., np.newaxis] * self.age_0_dist)
+            if profile is not None:
+                profile.lap('age-0 recruitment')
+            biomass = self.biomass(population)
+            if profile is not None:
+                profile.lap('node state')
+
+        grown = self.grow(projection_matrix, population)
+        if profile is not None:
+            profile.lap('growth matvec')
+        population_next = grown * \
+            self.survival[..., np.newaxis, :] * \
+            (1.0 - self.harvest_level(year, month))[..., np.newaxis, :]
+        if profile is not None:
+            profile.lap('survival/harvest')
+
+        self.movement.apply(population, biomass, profile)
+        return population_next
+
+    def project(self, history, age_0, commit=None, stop=None):
+        '''
+        Project through all years and months.
+
+        Parameters
+        ----------
+        history : array
+            (nodes, groups, n_points, slots) populations. Time t is
+            written to slot t % slots, and slot 0 holds the start
+            populations.
+        age_0 : array
+            (nodes, groups, n_years + 1) age-0 individuals, updated
+            in place.
+        commit : callable or None
+            Called with each time index once its population is final,
+            for example history.history_store.commit.
+        stop : callable or None
+            Called with the year and population at the start of each
+            year after the first, for example
+            history.convergence_rule.settled. When it returns True the
+            projection stops.
+
+        Returns
+        -------
+        The year the projection stopped at, or None if it ran to the
+        end.
+        '''
+        n_slots = history.shape[-1]
+        profile = self.profile
+        population = history[..., 0].copy()
+        for year in range(self.n_years):
+            if stop is not None and year > 0 and stop(year, population):
+                if profile is not None:
+                    profile.lap('convergence check')
+                return year
+            if stop is not None and profile is not None:
+                profile.lap('convergence check')
+            for month in range(self.n_months):
+                current_time_index = year * self.n_months + month
+                population_next = self.project_month(population, age_0,
+                                                     year, month)
+                history[..., current_time_index % n_slots] = population
+                if commit is not None:
+                    commit(current_time_index)
+                if profile is not None:
+                    profile.lap('history commit')
+                population = population_next
+        final_time_index = self.n_years * self.n_months
+        history[..., final_time_index % n_slots] = population
+        if commit is not None:
+            commit(final_time_index)
+        if profile is not None:
+            profile.lap('history commit')
+        return None
@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from MetaIPM import populated_network
+
+# Network creator held by each worker process of map_tasks
+creator = None
+
+
+def initialize(input_data, settings=None):
+    '''
+    Build the worker's network once from a creator's inputs.
+
+    Parameters
+    ----------
+    input_data : dict
+        Inputs of populate_network_from_csv, as returned by
+        populate_network_from_csv.input_data.
+    settings : dict or None
+        Run settings of the creator's network (network.run_settings),
+        applied to the worker's copy.
+    '''
+    global creator
+    creator = populated_network.populate_network_from_csv(**input_data)
+    if settings is not None:
+        creator.network.apply_run_settings(settings)
+
+
+def map_tasks(function, tasks, network_creator, n_workers=None):
+    '''
+    Run function on every task in a pool of worker processes.
+
+    Each worker first builds its own copy of network_creator's
+    network, with its run settings, as workers.creator; function
+    takes one task, works on that copy and returns a picklable result.
+    function must be importable from a module (not a lambda or a
+    local function).
+
+    Parameters
+    ----------
+    function : callable
+        Called as function(task) in a worker process.
+    tasks : list
+        Tasks, each passed to one call of function.
+    network_creator : populated_network.populate_network_from_csv
+        Template network copied by the workers.
+    n_workers : int or None
+        Number of processes. None uses all CPUs and 1 runs the tasks
+        in this process, on a copy of the network.
+
+    Returns
+    -------
+    List of the results in the order of tasks.
+    '''
+    input_data = network_creator.input_data()
+    settings = network_creator.network.run_settings()
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    if n_workers == 1:
+        initialize(input_data, settings)
+        return [function(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=n_workers,
+                             initializer=initialize,
+                             initargs=(input_data, settings)) as executor:
+        return list(executor.map(
+            function, tasks,
+            chunksize=max(1, len(tasks) // (4 * n_workers))))
+
+
+def set_overrides(network, overrides):
+    '''
+    Apply parameter overrides on top of the network's own.
+
+    Returns the overrides they replaced, None for parameters that
+    were not overridden, for restore_overrides.
+    '''
+    earlier = {key: network.parameter_overrides.get(key)
+               for key in overrides}
+    for key, value in overrides.items():
+        network.set_parameter_override(key, value)
+    return earlier
+
+
+def restore_overrides(network, earlier):
+    '''Undo set_overrides, given the overrides it returned.'''
+    for key, value in earlier.items():
+        if value is None:
+            network.clear_parameter_override(key)
+        else:
+            network.set_parameter_override(key, value)
@@ -0,0 +1,69 @@
+"""
+Benchmark banded growth kernels against dense ones.
+
+For each mesh size and growth standard deviation, times building a
+kernel and applying it to the two groups of a node, as project_node
+does every month, with the dense MetaIPM.node.growth_kernel and the
+truncated MetaIPM.node.banded_growth_kernel. Reports the fraction of
+entries the band keeps and the largest error of the projected
+population relative to its largest value.
+
+With MetaIPM installed, run
+
+    python benchmarks/banded_kernel.py
+"""
+import timeit
+
+import numpy as np
+
+from MetaIPM.node import banded_growth_kernel, growth_kernel
+
+# Parameters from the LaGrange/Peoria hyper-parameters
+vonB_K = 0.533
+vonB_Linf = 778.0
+tolerance = 1e-8
+
+
+def time_call(function, repeat=5):
+    '''Best time of repeat calls in seconds.'''
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def build_and_apply(kernel_builder, population):
+    '''Build a kernel and apply it to each group's population.'''
+    kernel = kernel_builder()
+    return [kernel @ group_population for group_population in population]
+
+
+def main(points=(100, 400, 1000, 4000), sigmas=(40.0, 10.0)):
+    print("n_points  sigma  fill   dense (s)  banded (s)  speedup  "
+          "max rel diff")
+    rng = np.random.default_rng(0)
+    for n_points in points:
+        omega = np.linspace(0.01, 1000, n_points + 2)[1:-1]
+        location = vonB_K * omega + (1 - vonB_K) * vonB_Linf
+        population = rng.random((2, n_points))
+        for sigma in sigmas:
+            def dense():
+                return growth_kernel(omega, location, sigma)
+
+            def banded():
+                return banded_growth_kernel(omega, location, sigma,
+                                            tolerance, max_fill=1.0)
+
+            exact = np.array(build_and_apply(dense, population))
+            approximate = np.array(build_and_apply(banded, population))
+            fill = banded().nnz / n_points ** 2
+            t_dense = time_call(lambda: build_and_apply(dense, population))
+            t_banded = time_call(lambda: build_and_apply(banded, population))
+            print("{:>8d}  {:>5.0f}  {:.3f}  {:>9.4f}  {:>10.4f}  {:>7.1f}  "
+                  "{:.2e}".format(
+                      n_points, sigma, fill, t_dense, t_banded,
+                      t_dense / t_banded,
+                      np.abs(approximate - exact).max() / exact.max()))
+    print("Tolerance " + str(tolerance) + ". Kernels keeping more than "
+          "max_fill of their entries fall back to dense in the model.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Accuracy report for float32 projections.
+
+Projects the LaGrange/Peoria network deterministically in float64 and
+float32 (network.set_dtype) with both engines and reports the run
+time, history memory and the relative error of the float32 trajectory
+in node totals, node biomass and length distributions.
+
+With MetaIPM installed, run
+
+    python benchmarks/float32_accuracy.py [model data directory]
+
+The model data directory defaults to LaGrange_Peoria_IPM/ModelData
+next to this package.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from MetaIPM import populated_network
+from MetaIPM import summarize_outputs as so
+
+default_data = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', 'LaGrange_Peoria_IPM', 'ModelData')
+
+input_files = {'network_data': 'network.csv',
+               'transition_data': 'psi.csv',
+               'transition_key_data': 'psi_key.csv',
+               'node_data': 'node.csv',
+               'group_data': 'group_details.csv',
+               'lw_data': 'LW_Pool.csv',
+               'vonB_data': 'vonB.csv',
+               'vonB_sigma_data': 'vonB_sigma.csv',
+               'maturity_data': 'maturity.csv'}
+
+
+def project(data_directory, dtype, engine):
+    '''Project the network and return its history and run time.'''
+    csv_inputs = {name: pd.read_csv(os.path.join(data_directory, file_name))
+                  for name, file_name in input_files.items()}
+    creator = populated_network.populate_network_from_csv(
+        **csv_inputs, stochastic_spawn=False, stochastic_pars=False)
+    network = creator.network
+    network.set_dtype(dtype)
+    start = time.perf_counter()
+    network.project_network(engine=engine)
+    elapsed = time.perf_counter() - start
+    return so.extract_population_array(network), network, elapsed
+
+
+def relative_error(approximate, exact):
+    '''Largest error relative to the largest exact value at each time.'''
+    scale = np.abs(exact).max(axis=tuple(range(exact.ndim - 1)))
+    scale[scale == 0] = 1.0
+    return (np.abs(approximate - exact).max(
+        axis=tuple(range(exact.ndim - 1))) / scale).max()
+
+
+def main(data_directory=default_data):
+    print("engine  dtype    time (s)  history (MB)  totals     biomass"
+          "    lengths")
+    for engine in ['object', 'tensor']:
+        exact, network, t_exact = project(data_directory, np.float64, engine)
+        print("{:<7s} float64  {:>8.3f}  {:>12.2f}".format(
+            engine, t_exact, network.population_tensor.nbytes / 1e6))
+
+        approximate, network, t_approximate = project(
+            data_directory, np.float32, engine)
+        lengths = np.moveaxis(exact.values, 2, -1)
+        print("{:<7s} float32  {:>8.3f}  {:>12.2f}  {:.2e}   {:.2e}   "
+              "{:.2e}".format(
+                  engine, t_approximate,
+                  network.population_tensor.nbytes / 1e6,
+                  relative_error(approximate.node_totals(),
+                                 exact.node_totals()),
+                  relative_error(approximate.biomass(), exact.biomass()),
+                  relative_error(np.moveaxis(approximate.values, 2, -1),
+                                 lengths)))
+    print("Errors are the largest over time of the maximum absolute "
+          "error divided by the largest float64 value at that time.")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,65 @@
+"""
+Benchmark the growth kernel builder.
+
+Compares the column-by-column kernel construction that node.growth
+used to do against the broadcast MetaIPM.node.growth_kernel.
+
+With MetaIPM installed, run
+
+    python benchmarks/growth_kernel.py
+"""
+import timeit
+
+import numpy as np
+import scipy.stats as stats
+
+from MetaIPM.node import growth_kernel
+
+# Parameters from the LaGrange/Peoria hyper-parameters
+vonB_K = 0.533
+vonB_Linf = 778.0
+vonB_sigma_k = 40.0
+shift = np.exp(-1e-10 * 3e5)
+
+
+def growth_kernel_loop(z, z_prime, location, scale):
+    '''Reference column loop formerly used by node.growth.'''
+    project = np.zeros((len(z_prime), len(z)))
+    for index in range(0, len(z)):
+        prob_raw = stats.norm.pdf(x=z_prime,
+                                  loc=location[index],
+                                  scale=scale)
+        if prob_raw.sum() == 0:
+            project[:, index] = 0
+        else:
+            project[:, index] = prob_raw / prob_raw.sum()
+    return project
+
+
+def time_call(function, repeat=5):
+    '''Best time of repeat calls in seconds.'''
+    number = 1
+    return min(timeit.repeat(function, number=number, repeat=repeat))
+
+
+def main(points=(100, 400, 1000)):
+    print("n_points  loop (s)   broadcast (s)  speedup  max |diff|")
+    for n_points in points:
+        omega = np.linspace(0.01, 1000, n_points + 2)[1:-1]
+        location = (vonB_K * omega + (1 - vonB_K) * vonB_Linf) * shift
+
+        loop = growth_kernel_loop(omega, omega, location, vonB_sigma_k)
+        broadcast = growth_kernel(omega, location, vonB_sigma_k)
+        diff = np.abs(loop - broadcast).max()
+
+        t_loop = time_call(
+            lambda: growth_kernel_loop(omega, omega, location, vonB_sigma_k))
+        t_broadcast = time_call(
+            lambda: growth_kernel(omega, location, vonB_sigma_k))
+
+        print("{:>8d}  {:>8.4f}   {:>13.5f}  {:>7.1f}  {:.2e}".format(
+            n_points, t_loop, t_broadcast, t_loop / t_broadcast, diff))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Convergence of the length discretizations.
+
+Projects the LaGrange/Peoria network deterministically with the tensor
+engine on meshes of increasing size for each quadrature
+(mesh.length_mesh): the default midpoint mesh, bin-integrated ('cdf')
+and Gauss-Legendre ('gauss') meshes, and graded meshes that are denser
+between 300 and 900 mm. Node totals and biomass are compared with a
+fine Gauss-Legendre reference, so the table shows how many points each
+discretization needs for a given accuracy.
+
+With MetaIPM installed, run
+
+    python benchmarks/mesh_convergence.py [model data directory]
+
+The model data directory defaults to LaGrange_Peoria_IPM/ModelData
+next to this package.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from MetaIPM import populated_network
+
+default_data = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', 'LaGrange_Peoria_IPM', 'ModelData')
+
+input_files = {'network_data': 'network.csv',
+               'transition_data': 'psi.csv',
+               'transition_key_data': 'psi_key.csv',
+               'node_data': 'node.csv',
+               'group_data': 'group_details.csv',
+               'lw_data': 'LW_Pool.csv',
+               'vonB_data': 'vonB.csv',
+               'vonB_sigma_data': 'vonB_sigma.csv',
+               'maturity_data': 'maturity.csv'}
+
+# (quadrature, mesh_focus) of each discretization
+discretizations = [('midpoint', None),
+                   ('cdf', None),
+                   ('gauss', None),
+                   ('midpoint', '300;900;4'),
+                   ('cdf', '300;900;4')]
+
+mesh_sizes = [12, 25, 50, 100, 200, 400]
+reference_size = 800
+
+
+def project(csv_inputs, n_points, quadrature, focus):
+    '''Project on a mesh and return node totals, biomass and run time.'''
+    network_data = csv_inputs['network_data'].copy()
+    network_data['n_points'] = n_points
+    network_data['quadrature'] = quadrature
+    if focus is not None:
+        network_data['mesh_focus'] = focus
+    creator = populated_network.populate_network_from_csv(
+        **dict(csv_inputs, network_data=network_data),
+        stochastic_spawn=False, stochastic_pars=False)
+    network = creator.network
+    start = time.perf_counter()
+    network.project_network(engine='tensor')
+    elapsed = time.perf_counter() - start
+    population = network.population_tensor
+    weights = np.stack([node_idx.length_weight(network.omega)
+                        for node_idx in network.nodes])
+    return (population.sum(axis=(1, 2)),
+            np.einsum('ngzt,nz->nt', population, weights),
+            elapsed)
+
+
+def relative_error(approximate, exact):
+    '''Largest error relative to the largest exact value at each time.'''
+    return (np.abs(approximate - exact).max(axis=0) /
+            np.abs(exact).max(axis=0)).max()
+
+
+def main(data_directory=default_data):
+    csv_inputs = {name: pd.read_csv(os.path.join(data_directory, file_name))
+                  for name, file_name in input_files.items()}
+    totals, biomass, _ = project(csv_inputs, reference_size, 'gauss', None)
+
+    print("quadrature  focus       points  time (s)  totals     biomass")
+    for quadrature, focus in discretizations:
+        for n_points in mesh_sizes:
+            approximate_totals, approximate_biomass, elapsed = project(
+                csv_inputs, n_points, quadrature, focus)
+            print("{:<10s}  {:<10s}  {:>6d}  {:>8.3f}  {:.2e}   {:.2e}".format(
+                quadrature, str(focus), n_points, elapsed,
+                relative_error(approximate_totals, totals),
+                relative_error(approximate_biomass, biomass)))
+    print("Errors are the largest over time of the maximum absolute error "
+          "divided by the largest value at that time of a " +
+          str(reference_size) + "-point 'gauss' reference.")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,315 @@
+"""
+Benchmark suite for the projection hot paths.
+
+Times node.growth, node.project_node, one month of the object engine
+(network.project_month) and of the tensor engine
+(network_tensor.project_month), summarize_outputs.extract_all_populations,
+building a network with populated_network.populate_network_from_csv
+and stochastic_model.run_stochastic. Each is scaled along one of
+n_points, n_years, n_months, the number of nodes and the number of
+groups, with the others held at the base size. Networks are synthetic
+copies of the LaGrange/Peoria inputs (synthetic_inputs): nodes repeat
+pool a on a ring of paths and groups repeat the Male and Female rows.
+
+Results are written as JSON together with the commit, package versions
+and machine, so runs on the same hardware can be compared across
+commits. With MetaIPM installed, run
+
+    python benchmarks/suite.py [--output results.json] [--quick]
+    python benchmarks/suite.py --compare old.json new.json
+
+--quick uses two sizes per axis and one repeat, as a smoke test.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from MetaIPM import movement
+from MetaIPM import populated_network
+from MetaIPM import stochastic_wrapper
+from MetaIPM import summarize_outputs
+from MetaIPM import tensor_projection
+
+default_data = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', 'LaGrange_Peoria_IPM', 'ModelData')
+
+input_files = {'network_data': 'network.csv',
+               'transition_data': 'psi.csv',
+               'transition_key_data': 'psi_key.csv',
+               'node_data': 'node.csv',
+               'group_data': 'group_details.csv',
+               'lw_data': 'LW_Pool.csv',
+               'vonB_data': 'vonB.csv',
+               'vonB_sigma_data': 'vonB_sigma.csv',
+               'maturity_data': 'maturity.csv'}
+
+base_size = {'n_points': 100, 'n_years': 10, 'n_months': 1, 'n_nodes': 2,
+             'n_groups': 2}
+
+axes = {'n_points': [50, 100, 200, 400, 800],
+        'n_years': [5, 10, 20, 40],
+        'n_months': [1, 2, 4, 12],
+        'n_nodes': [2, 4, 8, 16],
+        'n_groups': [2, 4, 8]}
+
+
+def synthetic_inputs(templates, n_points, n_years, n_months, n_nodes,
+                     n_groups):
+    '''
+    Inputs for populate_network_from_csv of a synthetic network.
+
+    templates are the LaGrange/Peoria inputs. Nodes copy pool a and are
+    joined to their neighbours on a ring (for two nodes, the template's
+    a-b network), each path with the template's mean probability split
+    over the node's outgoing paths. Groups alternate between copies of
+    the template's Male and Female rows.
+    '''
+    network_data = templates['network_data'].copy()
+    network_data['n_points'] = n_points
+    network_data['n_years'] = n_years
+    network_data['no_months'] = n_months
+
+    names = ['p{:03d}'.format(index) for index in range(n_nodes)]
+    node_row = templates['node_data'].iloc[[0]]
+    node_data = pd.concat([node_row.assign(Pool=name) for name in names],
+                          ignore_index=True)
+
+    group_rows = templates['group_data'][
+        templates['group_data']['Node'] == templates['group_data'][
+            'Node'].values[0]]
+    groups = []
+    for group_index in range(n_groups):
+        row = group_rows.iloc[[group_index % len(group_rows)]]
+        name = row['Group'].values[0]
+        if group_index >= len(group_rows):
+            name = name + str(group_index // len(group_rows))
+        groups.append(row.assign(Group=name))
+    group_data = pd.concat([group.assign(Node=name)
+                            for name in names for group in groups],
+                           ignore_index=True)
+
+    pairs = [(start, (start + 1) % n_nodes) for start in range(n_nodes)]
+    if n_nodes > 2:
+        pairs += [(end, start) for start, end in pairs]
+    else:
+        pairs += [(1, 0)]
+    columns = ['{}_{}'.format(names[start], names[end])
+               for start, end in pairs]
+    probability = templates['transition_data'][
+        templates['transition_key_data']['column']].values.mean()
+    n_out = 2 if n_nodes > 2 else 1
+    # Laid out as read from psi.csv and psi_key.csv, with their index
+    transition_data = pd.DataFrame(dict(
+        {'Unnamed: 0': [0]},
+        **{column: [probability / n_out] for column in columns}))
+    transition_key_data = pd.DataFrame({
+        'Unnamed: 0': np.arange(len(columns)),
+        'column': columns,
+        'start': [names[start] for start, _ in pairs],
+        'end': [names[end] for _, end in pairs]})
+
+    return dict(templates, network_data=network_data, node_data=node_data,
+                group_data=group_data, transition_data=transition_data,
+                transition_key_data=transition_key_data)
+
+
+def build(inputs, stochastic_spawn=False):
+    '''Build a network creator without printing warnings.'''
+    with contextlib.redirect_stdout(io.StringIO()):
+        return populated_network.populate_network_from_csv(
+            **inputs, stochastic_spawn=stochastic_spawn,
+            stochastic_pars=False)
+
+
+def time_call(function, setup=None, repeat=5):
+    '''Times of repeat calls in seconds, running setup untimed first.'''
+    timer = timeit.Timer(function, setup=setup or (lambda: None))
+    return timer.repeat(number=1, repeat=repeat)
+
+
+def benchmarks(inputs, size, repeat):
+    '''Time every benchmark for one network size.'''
+    creator = build(inputs)
+    network = creator.network
+    node_idx = network.nodes[0]
+    omega = network.omega
+
+    def growth():
+        node_idx.growth(omega, omega, 0, omega, network.dtype,
+                        network.mesh.kernel_weights,
+                        network.mesh.kernel_edges)
+
+    def project_node():
+        node_idx.project_node(0, 0, network)
+
+    project_node()
+
+    month = {}
+
+    def new_object_month():
+        network.clear_nodes()
+        network.stack_populations()
+        month['movement'] = movement.movement_operator(network)
+
+    def object_month():
+        network.project_month(0, 0, month['movement'])
+
+    def new_tensor_month():
+        network.clear_nodes()
+        network.stack_populations()
+        month['engine'] = tensor_projection.network_tensor(network)
+        month['population'] = network.population_tensor[..., 0].copy()
+        month['age_0'] = network.age_0_tensor.copy()
+
+    def tensor_month():
+        month['engine'].project_month(month['population'], month['age_0'],
+                                      0, 0)
+
+    stochastic = {}
+
+    def new_stochastic_model():
+        np.random.seed(0)
+        stochastic['model'] = stochastic_wrapper.stochastic_model(
+            build(inputs, stochastic_spawn=True))
+
+    def run_stochastic():
+        with contextlib.redirect_stdout(io.StringIO()):
+            stochastic['model'].run_stochastic(1)
+
+    network.project_network()
+    timings = [
+        ('node.growth', time_call(growth, repeat=repeat)),
+        ('node.project_node', time_call(project_node, repeat=repeat)),
+        ('extract_all_populations', time_call(
+            lambda: summarize_outputs.extract_all_populations(network),
+            repeat=repeat)),
+        ('populate_network_from_csv', time_call(
+            lambda: build(inputs), repeat=repeat)),
+        ('run_stochastic', time_call(run_stochastic, new_stochastic_model,
+                                     repeat)),
+        ('project_month[object]', time_call(object_month, new_object_month,
+                                            repeat)),
+        ('project_month[tensor]', time_call(tensor_month, new_tensor_month,
+                                            repeat)),
+    ]
+
+    results = []
+    for name, times in timings:
+        results.append({'benchmark': name,
+                        'size': dict(size),
+                        'repeat': repeat,
+                        'best': min(times),
+                        'median': float(np.median(times)),
+                        'times': times})
+    return results
+
+
+def environment():
+    '''Commit, package versions and machine of a run.'''
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit or None,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()}
+
+
+def run(data_directory=default_data, quick=False, repeat=5):
+    '''
+    Run the suite and return its results as a dictionary.
+
+    Each result gives the benchmark, the network size, and the best
+    and median time per call in seconds. The project_month benchmarks
+    time the first month of a run, without building the engine.
+    '''
+    templates = {name: pd.read_csv(os.path.join(data_directory, file_name))
+                 for name, file_name in input_files.items()}
+    if quick:
+        repeat = 1
+    results = []
+    for axis, values in axes.items():
+        if quick:
+            values = values[:2]
+        for value in values:
+            size = dict(base_size, **{axis: value})
+            print("{:<8s} {:>4d}".format(axis, value), file=sys.stderr)
+            for result in benchmarks(synthetic_inputs(templates, **size),
+                                     size, repeat):
+                result['axis'] = axis
+                results.append(result)
+    return {'environment': environment(),
+            'base_size': base_size,
+            'results': results}
+
+
+def result_key(result):
+    return (result['benchmark'], result['axis'],
+            result['size'][result['axis']])
+
+
+def compare(old_file, new_file):
+    '''Print the ratio of best times of two result files.'''
+    with open(old_file) as file:
+        old = json.load(file)
+    with open(new_file) as file:
+        new = json.load(file)
+    old_results = {result_key(result): result for result in old['results']}
+    print("{} -> {}".format(old['environment']['commit'],
+                            new['environment']['commit']))
+    print("benchmark                          axis       size  old (s)   "
+          "new (s)   new/old")
+    for result in new['results']:
+        key = result_key(result)
+        if key not in old_results:
+            continue
+        best_old = old_results[key]['best']
+        print("{:<33s}  {:<9s}  {:>4d}  {:.2e}  {:.2e}  {:>7.2f}".format(
+            key[0], key[1], key[2], best_old, result['best'],
+            result['best'] / best_old))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--data', default=default_data,
+                        help='LaGrange/Peoria model data directory')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='JSON file for the results')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timed calls per benchmark')
+    parser.add_argument('--quick', action='store_true',
+                        help='two sizes per axis and one repeat')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of running')
+    arguments = parser.parse_args()
+    if arguments.compare:
+        compare(*arguments.compare)
+        return
+    results = run(arguments.data, arguments.quick, arguments.repeat)
+    with open(arguments.output, 'w') as file:
+        json.dump(results, file, indent=1)
+    print("Results written to " + arguments.output, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://code.usgs.gov/umesc/metaIPM",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['tests', 'tests.*']),
     install_requires=['matplotlib','numpy','pandas','scipy','seaborn'],
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -0,0 +1,70 @@
+"""
+LaGrange/Peoria model inputs shared by the tests.
+
+The tests use the CSV files in LaGrange_Peoria_IPM/ModelData next to
+this package and are skipped when they are missing.
+"""
+import os
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from MetaIPM import populated_network
+
+data_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', '..', 'LaGrange_Peoria_IPM', 'ModelData')
+
+input_files = {'network_data': 'network.csv',
+               'transition_data': 'psi.csv',
+               'transition_key_data': 'psi_key.csv',
+               'node_data': 'node.csv',
+               'group_data': 'group_details.csv',
+               'lw_data': 'LW_Pool.csv',
+               'vonB_data': 'vonB.csv',
+               'vonB_sigma_data': 'vonB_sigma.csv',
+               'maturity_data': 'maturity.csv'}
+
+requires_data = unittest.skipUnless(os.path.isdir(data_directory),
+                                    "LaGrange/Peoria model data not found")
+
+
+def load_inputs(**network_changes):
+    '''
+    Read the model inputs, with network.csv columns replaced by
+    network_changes, for example n_years=10.
+    '''
+    inputs = {name: pd.read_csv(os.path.join(data_directory, file_name))
+              for name, file_name in input_files.items()}
+    for column, value in network_changes.items():
+        inputs['network_data'][column] = value
+    return inputs
+
+
+def build(stochastic_spawn=False, **network_changes):
+    '''
+    Build a network creator from the model inputs.
+
+    Parameters are deterministic (stochastic_pars False); the spawning
+    probability is drawn each year with stochastic_spawn.
+    '''
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        return populated_network.populate_network_from_csv(
+            **load_inputs(**network_changes),
+            stochastic_spawn=stochastic_spawn, stochastic_pars=False)
+
+
+def project(network, engine='object'):
+    '''Project a network and return a copy of its population tensor.'''
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        network.project_network(engine=engine)
+    return np.array(network.population_tensor)
+
+
+def relative_difference(approximate, exact):
+    '''Largest absolute difference relative to the largest value.'''
+    return np.abs(np.asarray(approximate) - np.asarray(exact)).max() / \
+        np.abs(np.asarray(exact)).max()
@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+@requires_data
+class test_convergence(unittest.TestCase):
+    """Runs stopped by the convergence check against full runs."""
+
+    tolerance = 1e-8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.full = {engine: project(build().network, engine)
+                    for engine in ['object', 'tensor']}
+
+    def stopped_run(self, engine, fill):
+        network = build().network
+        network.set_convergence_check(tolerance=self.tolerance, fill=fill)
+        population = project(network, engine)
+        self.assertIsNotNone(network.stopped_year)
+        self.assertLess(network.stopped_year, network.n_years)
+        return network, population, network.stopped_year * network.n_months
+
+    def test_filled_history(self):
+        for engine, full in self.full.items():
+            with self.subTest(engine=engine):
+                network, population, start = self.stopped_run(engine, True)
+                np.testing.assert_array_equal(population[..., :start],
+                                              full[..., :start])
+                self.assertLess(relative_difference(population, full),
+                                10 * self.tolerance)
+                self.assertLess(relative_difference(population[..., -1],
+                                                    full[..., -1]),
+                                10 * self.tolerance)
+
+    def test_no_fill(self):
+        for engine, full in self.full.items():
+            with self.subTest(engine=engine):
+                network, population, start = self.stopped_run(engine, False)
+                np.testing.assert_array_equal(population[..., :start],
+                                              full[..., :start])
+                self.assertTrue(np.isnan(population[..., start:]).all())
+                self.assertTrue(np.isnan(
+                    network.age_0_tensor[..., network.stopped_year + 1:]
+                ).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
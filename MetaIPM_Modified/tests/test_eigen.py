@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import eigen
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+def density_independent():
+    '''The model network with g_length = 0 at every node.'''
+    network = build().network
+    for node_idx in network.nodes:
+        network.set_node_parameter(node_idx.show_node_name(), 'g_length',
+                                   0.0)
+    return network
+
+
+@requires_data
+class test_eigen(unittest.TestCase):
+    """lambda and its elasticities from the annual operator."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.network = density_independent()
+        cls.operator = eigen.annual_operator(cls.network)
+        cls.growth_rate = cls.operator.solve('arpack')
+
+    def test_methods_agree(self):
+        power = eigen.annual_operator(self.network)
+        self.assertAlmostEqual(power.solve('power') / self.growth_rate, 1.0,
+                               places=10)
+        self.assertLess(relative_difference(power.stable_population,
+                                            self.operator.stable_population),
+                        1e-6)
+        with self.assertRaises(ValueError):
+            power.solve('dense')
+
+    def test_long_run_growth(self):
+        network = density_independent()
+        totals = project(network).sum(axis=2).sum(axis=1).sum(axis=0)
+        # Totals at the start of each year; the last step is the end
+        yearly = totals[:-1:network.n_months]
+        self.assertAlmostEqual(yearly[-1] / yearly[-2] / self.growth_rate,
+                               1.0, places=8)
+
+    def test_elasticities_sum_to_one(self):
+        # lambda is homogeneous of degree one in the kernels and
+        # recruitment together, and in survival and recruitment
+        elasticity = eigen.lambda_sensitivity(self.operator)
+        recruit = elasticity.recruit_elasticity.sum()
+        self.assertAlmostEqual(
+            elasticity.kernel_elasticity.sum() + recruit, 1.0, places=10)
+        self.assertAlmostEqual(
+            elasticity.survival_elasticity.sum() + recruit, 1.0, places=10)
+
+    def test_density_dependent(self):
+        with self.assertRaises(ValueError):
+            eigen.annual_operator(build(n_years=10).network)
+
+
+if __name__ == '__main__':
+    unittest.main()
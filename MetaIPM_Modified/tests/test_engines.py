@@ -0,0 +1,52 @@
+import unittest
+
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+@requires_data
+class test_engines(unittest.TestCase):
+    """The object and tensor engines give the same populations."""
+
+    def assert_engines_agree(self, **network_changes):
+        network = build(**network_changes).network
+        by_object = project(network, 'object')
+        network.clear_nodes()
+        by_tensor = project(network, 'tensor')
+        self.assertEqual(by_object.shape, by_tensor.shape)
+        self.assertLess(relative_difference(by_tensor, by_object), 1e-12)
+
+    def test_lagrange_peoria(self):
+        self.assert_engines_agree()
+
+    def test_several_months(self):
+        self.assert_engines_agree(n_years=20, no_months=3)
+
+    def test_bin_integrated_mesh(self):
+        self.assert_engines_agree(n_years=20, n_points=50, quadrature='cdf')
+
+    def test_repeated_runs(self):
+        network = build(n_years=20).network
+        first = project(network)
+        network.clear_nodes()
+        self.assertTrue((project(network) == first).all())
+
+    def test_direct_parameter_write(self):
+        network = build(n_years=20).network
+        project(network)
+        network.nodes[0].surv_max = 0.5
+        network.nodes[1].lw_beta1 += 0.1
+        expected = build(n_years=20).network
+        expected.set_node_parameter('a', 'surv_max', 0.5)
+        expected.set_node_parameter('b', 'lw_beta1',
+                                    network.nodes[1].lw_beta1)
+        expected = project(expected)
+        for engine in ['object', 'tensor']:
+            with self.subTest(engine=engine):
+                network.clear_nodes()
+                self.assertLess(relative_difference(
+                    project(network, engine), expected), 1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
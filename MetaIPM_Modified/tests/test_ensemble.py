@@ -0,0 +1,28 @@
+import unittest
+
+from MetaIPM import ensemble
+from MetaIPM import stochastic_wrapper
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+@requires_data
+class test_ensemble(unittest.TestCase):
+    """Ensemble members match projecting each draw on its own."""
+
+    def test_stochastic_members(self):
+        creator = build(stochastic_spawn=True, n_years=20)
+        members = ensemble.network_ensemble(creator)
+        members.add_stochastic_members(3, seed=5)
+        population = members.project(batch_size=2)
+        self.assertEqual(population.shape[0], 3)
+        for member in range(3):
+            stochastic_wrapper.seed_iteration(5, member)
+            creator.new_stochastic_parameters()
+            single = project(creator.network)
+            self.assertLess(
+                relative_difference(population[member], single), 1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import equilibrium
+from tests.model_data import build, requires_data
+
+
+@requires_data
+class test_equilibrium(unittest.TestCase):
+    """newton_krylov fixed point of the annual map."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.network = build().network
+
+    def solve(self, warm_start_years):
+        solver = equilibrium.equilibrium(self.network)
+        self.assertTrue(solver.solve(warm_start_years=warm_start_years))
+        self.assertFalse(solver.trivial)
+        return solver
+
+    def test_fixed_point(self):
+        solver = self.solve(20)
+        x = solver.join(solver.population, solver.age_0)
+        after = solver.annual_map(x)
+        self.assertLess(np.abs(after - x).max() / np.abs(x).max(), 1e-10)
+        np.testing.assert_allclose(solver.node_totals,
+                                   solver.population.sum(-1).sum(-1))
+
+    def test_warm_start(self):
+        # Newton map evaluations, not counting the warm start itself
+        short = self.solve(10)
+        long = self.solve(40)
+        self.assertLess(long.map_evaluations - 40,
+                        short.map_evaluations - 10)
+        np.testing.assert_allclose(long.node_totals, short.node_totals,
+                                   rtol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from MetaIPM import summarize_outputs
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+@requires_data
+class test_history(unittest.TestCase):
+    """Retention policies and run directories keep the full history."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.full = project(build(n_years=20, no_months=2).network)
+
+    def test_retention_policies(self):
+        policies = [('every', {'every': 3}), ('year_starts', {}),
+                    ('window', {'window': 5})]
+        for engine in ['object', 'tensor']:
+            for kind, arguments in policies:
+                with self.subTest(engine=engine, kind=kind):
+                    network = build(n_years=20, no_months=2).network
+                    network.set_history_retention(kind, **arguments)
+                    project(network, engine)
+                    population, times = network.retained_population()
+                    self.assertLess(relative_difference(
+                        population, self.full[..., times]), 1e-12)
+
+    def test_summary(self):
+        network = build(n_years=20, no_months=2).network
+        network.set_history_retention('summary')
+        project(network)
+        totals = self.full.sum(axis=2).sum(axis=1)
+        self.assertLess(relative_difference(network.history.node_totals,
+                                            totals), 1e-12)
+        weights = np.stack([node_idx.length_weight(network.omega)
+                            for node_idx in network.nodes])
+        biomass = np.einsum('ngzt,nz->nt', self.full, weights)
+        self.assertLess(relative_difference(network.history.node_biomass,
+                                            biomass), 1e-12)
+        lengths = np.einsum('ngzt,z->nt', self.full, network.omega)
+        self.assertLess(relative_difference(
+            network.history.node_mean_length, lengths / totals), 1e-12)
+        self.assertLess(relative_difference(
+            network.history.node_mean_weight, biomass / totals), 1e-12)
+
+    def test_run_directory(self):
+        for engine, kind, arguments in [
+                ('object', 'full', {}), ('object', 'window', {'window': 5}),
+                ('tensor', 'full', {}), ('tensor', 'every', {'every': 3})]:
+            with self.subTest(engine=engine, kind=kind), \
+                    tempfile.TemporaryDirectory() as directory:
+                network = build(n_years=20, no_months=2).network
+                network.set_history_retention(kind, **arguments)
+                network.set_run_directory(directory)
+                project(network, engine)
+                reopened = summarize_outputs.open_population_history(
+                    directory)
+                self.assertEqual(reopened.nodes, ['a', 'b'])
+                self.assertLess(relative_difference(
+                    reopened.values,
+                    np.moveaxis(self.full[..., reopened.times], -1, 2)),
+                    1e-12)
+                del network, reopened
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import kernel_cache
+from tests.model_data import build, project, requires_data
+
+
+class test_growth_kernel_cache(unittest.TestCase):
+    """Least-recently-used lookups, counts and quantization."""
+
+    def setUp(self):
+        self.built = []
+
+    def build(self, shift):
+        self.built.append(shift)
+        return np.full(3, shift)
+
+    def test_lru_eviction(self):
+        cache = kernel_cache.growth_kernel_cache(maxsize=2)
+        for parameters in ['a', 'b', 'a', 'c', 'a', 'b']:
+            cache.lookup(parameters, 1.0, self.build)
+        # b is evicted by c, then c by b
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 4)
+        self.assertEqual(cache.stats()['evictions'], 2)
+        self.assertEqual(list(cache.kernels), [('a', 1.0), ('b', 1.0)])
+        self.assertEqual(len(self.built), 4)
+
+    def test_quantization(self):
+        cache = kernel_cache.growth_kernel_cache(quantization=1e-3)
+        first = cache.lookup('a', 0.50001, self.build)
+        second = cache.lookup('a', 0.49998, self.build)
+        self.assertIs(first, second)
+        self.assertEqual(self.built, [0.5])
+        cache.lookup('a', 0.5006, self.build)
+        self.assertEqual(cache.stats()['misses'], 2)
+        exact = kernel_cache.growth_kernel_cache()
+        exact.lookup('a', 0.50001, self.build)
+        exact.lookup('a', 0.49998, self.build)
+        self.assertEqual(exact.stats()['misses'], 2)
+
+    def test_read_only(self):
+        cache = kernel_cache.growth_kernel_cache()
+        with self.assertRaises(ValueError):
+            cache.lookup('a', 1.0, self.build)[0] = 0.0
+        with self.assertRaises(ValueError):
+            kernel_cache.growth_kernel_cache(maxsize=0)
+
+
+@requires_data
+class test_cached_projection(unittest.TestCase):
+    """Cached kernels give the same runs as uncached ones."""
+
+    def test_matches_uncached(self):
+        uncached = project(build(n_years=20).network)
+        network = build(n_years=20).network
+        network.set_kernel_cache()
+        np.testing.assert_array_equal(project(network), uncached)
+        misses = network.kernel_cache_stats()['a']['misses']
+        self.assertEqual(misses, 20)
+        # A repeated run follows the same biomass, so every kernel hits
+        network.clear_nodes()
+        np.testing.assert_array_equal(project(network), uncached)
+        stats = network.kernel_cache_stats()['a']
+        self.assertEqual((stats['hits'], stats['misses']), (20, misses))
+
+    def test_new_parameters(self):
+        creator = build(stochastic_spawn=True, n_years=20)
+        network = creator.network
+        network.set_kernel_cache()
+        project(network)
+        network.set_node_parameter('a', 'vonB_K',
+                                   network.nodes[0].vonB_K * 1.1)
+        creator.new_stochastic_parameters()
+        cached = project(network)
+
+        expected = build(stochastic_spawn=True, n_years=20).network
+        expected.spawn_prob = network.spawn_prob
+        expected.set_node_parameter('a', 'vonB_K', network.nodes[0].vonB_K)
+        np.testing.assert_array_equal(cached, project(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import mesh
+from MetaIPM import node
+
+
+class test_kernels(unittest.TestCase):
+    """Truncated growth kernels match the dense kernels."""
+
+    def setUp(self):
+        self.mesh = mesh.length_mesh.build(0.0, 1000.0, 60)
+        z = self.mesh.points
+        # Empty columns first, in the middle and last, next to full ones
+        self.location = np.concatenate(
+            [[-1e6], z[:20] + 20.0, [1e6, -1e6], z[20:] + 20.0, [1e6, 1e6]])
+
+    def assertMatchesDense(self, weights=None, edges=None):
+        dense = node.growth_kernel(self.mesh.points, self.location, 15.0,
+                                   weights=weights, edges=edges)
+        banded = node.banded_growth_kernel(
+            self.mesh.points, self.location, 15.0, 1e-14, weights=weights,
+            edges=edges, max_fill=1.0)
+        self.assertFalse(isinstance(banded, np.ndarray))
+        np.testing.assert_allclose(banded.toarray(), dense, atol=1e-12)
+        empty = np.abs(self.location) == 1e6
+        self.assertEqual(np.abs(dense[:, empty]).max(), 0)
+        self.assertEqual(np.abs(banded.toarray()[:, empty]).max(), 0)
+        np.testing.assert_allclose(banded.toarray().sum(axis=0)[~empty], 1)
+
+    def test_points(self):
+        self.assertMatchesDense(weights=self.mesh.kernel_weights)
+
+    def test_bins(self):
+        self.mesh = mesh.length_mesh.build(0.0, 1000.0, 60, 'cdf')
+        self.assertMatchesDense(edges=self.mesh.kernel_edges)
+
+    def test_all_empty(self):
+        banded = node.banded_growth_kernel(self.mesh.points, [1e6, -1e6],
+                                           15.0, 1e-6)
+        self.assertEqual(banded.shape, (60, 2))
+        self.assertEqual(banded.nnz, 0)
+
+    def test_wide_band(self):
+        self.assertIsInstance(node.banded_growth_kernel(
+            self.mesh.points, self.mesh.points, 1000.0, 1e-6), np.ndarray)
+
+
+if __name__ == '__main__':
+    unittest.main()
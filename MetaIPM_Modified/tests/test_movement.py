@@ -0,0 +1,127 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import group, movement, path
+
+
+class small_node:
+    '''Node with the attributes used by movement.'''
+    def __init__(self, name, g_migration, populations, omega):
+        self.name = name
+        self.g_migration = g_migration
+        self.groups = []
+        for group_name, population in populations.items():
+            grp = group.group_populated(group_name)
+            grp.population = np.array(population, dtype=float)[:, None]
+            self.groups.append(grp)
+        self.weights = omega ** 3
+
+    def show_node_name(self):
+        return self.name
+
+    def calculate_node_biomass(self, year, omega):
+        return sum((grp.show_group_pop_dist(year) * self.weights).sum()
+                   for grp in self.groups)
+
+
+class small_network:
+    '''Three nodes, one missing a group, with paths leaving the network.'''
+    def __init__(self):
+        self.omega = np.array([0.1, 0.2, 0.3])
+        self.dtype = np.float64
+        self.nodes = [
+            small_node('a', 1.0, {'g1': [10.0, 20.0, 5.0],
+                                  'g2': [1.0, 2.0, 3.0]}, self.omega),
+            small_node('b', 50.0, {'g1': [4.0, 0.0, 8.0],
+                                   'g2': [2.0, 6.0, 1.0]}, self.omega),
+            small_node('c', 0.0, {'g1': [3.0, 3.0, 3.0]}, self.omega)]
+        # a has three outgoing paths; the sum from b moves more than
+        # it holds, so b's groups are clamped to zero
+        self.populated_paths = [
+            path.populated_path('a', 'b', 0.2),
+            path.populated_path('b', 'a', 0.3),
+            path.populated_path('a', 'c', 0.4),
+            path.populated_path('b', 'outside', 0.6),
+            path.populated_path('c', 'a', 0.1),
+            path.populated_path('a', 'outside', 0.3)]
+        self.group_names = ['g1', 'g2']
+        self.group_present = np.array([[grp in [g.show_group_name()
+                                                for g in nd.groups]
+                                        for grp in self.group_names]
+                                       for nd in self.nodes])
+
+    def stacked(self):
+        population = np.zeros((3, 2, 3))
+        for node_index, nd in enumerate(self.nodes):
+            for grp in nd.groups:
+                group_index = self.group_names.index(grp.show_group_name())
+                population[node_index, group_index] = grp.population[:, 0]
+        return population
+
+    def biomass(self):
+        return np.array([nd.calculate_node_biomass(0, self.omega)
+                         for nd in self.nodes])
+
+    def move_by_path(self):
+        '''The per-path movement of populated_path, in its order.'''
+        by_name = {nd.show_node_name(): nd for nd in self.nodes}
+        for path_idx in self.populated_paths:
+            path_idx.add_to_path(by_name[path_idx.show_start()], 0, self)
+        for path_idx in self.populated_paths:
+            if path_idx.show_end() in by_name:
+                path_idx.add_to_node(by_name[path_idx.show_end()], 0)
+        for path_idx in self.populated_paths:
+            path_idx.subtract_from_node(by_name[path_idx.show_start()], 0)
+
+
+class test_movement_operator(unittest.TestCase):
+    """Movement of a month against the per-path transfers."""
+
+    def test_matches_paths(self):
+        network = small_network()
+        operator = movement.movement_operator(network)
+        population = network.stacked()
+        biomass = network.biomass()
+        operator.apply(population, biomass)
+        network.move_by_path()
+        np.testing.assert_allclose(population, network.stacked(),
+                                   rtol=1e-14, atol=1e-14)
+        # b moves 0.9 of nearly twice its population: zombie clamp
+        self.assertGreater(operator.migration(biomass)[1] * 0.9, 1.0)
+        np.testing.assert_array_equal(population[1], 0.0)
+        # c has no g2, so nothing arrives there
+        np.testing.assert_array_equal(population[2, 1], 0.0)
+
+    def test_rank_order(self):
+        # a's four paths take 1.1 of its population, one rank at a
+        # time; only g1, which gets little from b and c, goes below zero
+        network = small_network()
+        network.nodes[0].g_migration = 0.0
+        network.populated_paths.append(
+            path.populated_path('a', 'outside', 0.2))
+        operator = movement.movement_operator(network)
+        self.assertEqual([list(starts) for starts, paths
+                          in operator.outgoing],
+                         [[0, 1, 2], [0, 1], [0], [0]])
+        population = network.stacked()
+        operator.apply(population, network.biomass())
+        network.move_by_path()
+        np.testing.assert_allclose(population, network.stacked(),
+                                   rtol=1e-14, atol=1e-14)
+        np.testing.assert_array_equal(population[0, 0], 0.0)
+        self.assertGreater(population[0, 1].min(), 0.0)
+
+    def test_hand_computed(self):
+        network = small_network()
+        network.nodes = network.nodes[2:]
+        network.group_present = network.group_present[2:]
+        network.populated_paths = [path.populated_path('c', 'outside', 0.5)]
+        operator = movement.movement_operator(network)
+        population = np.array([[[3.0, 3.0, 3.0], [0.0, 0.0, 0.0]]])
+        operator.apply(population, network.biomass())
+        np.testing.assert_array_equal(population[0, 0], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import stochastic_wrapper
+from tests.model_data import build, requires_data
+
+
+@requires_data
+class test_overrides(unittest.TestCase):
+    """Clearing overrides restores the parameters of the current draw."""
+
+    def test_clear_after_redraw(self):
+        creator = build(stochastic_spawn=True, n_years=10)
+        network = creator.network
+        node_name = network.nodes[0].show_node_name()
+        path_idx = network.populated_paths[0]
+        start, end = path_idx.show_start(), path_idx.show_end()
+        probability = path_idx.probability
+        surv_max = network.nodes[0].surv_max
+
+        network.set_network_parameter('spawn_prob', 0.5)
+        network.set_path_probability(start, end, 0.1)
+        network.set_node_parameter(node_name, 'surv_max', 0.5)
+        stochastic_wrapper.seed_iteration(3, 0)
+        creator.new_stochastic_parameters()
+        np.testing.assert_array_equal(network.spawn_prob,
+                                      np.repeat(0.5, network.n_years))
+        network.clear_parameter_overrides()
+
+        reference = build(stochastic_spawn=True, n_years=10)
+        stochastic_wrapper.seed_iteration(3, 0)
+        reference.new_stochastic_parameters()
+        np.testing.assert_array_equal(network.spawn_prob,
+                                      reference.network.spawn_prob)
+        self.assertEqual(path_idx.probability, probability)
+        self.assertEqual(network.nodes[0].surv_max, surv_max)
+
+    def test_unsupported_keys(self):
+        network = build(n_years=10).network
+        for name in ['spawn_a', 'n_years', 'n_points', 'n_months',
+                     'set_dtype', 'missing']:
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                network.set_network_parameter(name, 1)
+        with self.assertRaises(ValueError):
+            network.set_network_parameter('spawn_prob', [0.5, 0.5])
+        with self.assertRaises(ValueError):
+            network.set_parameter_override(('group', 'a'), 1)
+        self.assertEqual(network.parameter_overrides, {})
+        self.assertEqual(network.parameter_defaults, {})
+        self.assertEqual(network.n_years, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
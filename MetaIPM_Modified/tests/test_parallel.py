@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import stochastic_wrapper
+from tests.model_data import build, project, requires_data
+
+
+@requires_data
+class test_parallel(unittest.TestCase):
+    """Worker processes keep the settings made on the network."""
+
+    def test_parallel_matches_serial(self):
+        creator = build(stochastic_spawn=True, n_years=10)
+        network = creator.network
+        network.set_history_retention('window', window=5)
+        network.set_dtype(np.float32)
+        node_name = network.nodes[0].show_node_name()
+        network.set_node_parameter(node_name, 'surv_max', 0.5)
+
+        model = stochastic_wrapper.stochastic_model(creator)
+        parallel = model.run_stochastic_parallel(3, n_workers=2, seed=11)
+        self.assertEqual(parallel.shape[-1], 5)
+        self.assertEqual(parallel.dtype, np.float32)
+
+        for index in range(3):
+            stochastic_wrapper.seed_iteration(11, index)
+            creator.new_stochastic_parameters()
+            self.assertEqual(network.nodes[0].surv_max, 0.5)
+            project(network)
+            serial, times = network.retained_population()
+            np.testing.assert_array_equal(parallel[index], serial)
+
+    def test_summary(self):
+        creator = build(stochastic_spawn=True, n_years=10)
+        network = creator.network
+        network.set_history_retention('summary')
+        model = stochastic_wrapper.stochastic_model(creator)
+        self.assertIsNone(model.run_stochastic_parallel(2, n_workers=2,
+                                                        seed=11))
+        model.run_stochastic_parallel(1, n_workers=1, seed=11)
+        self.assertEqual(model.ensemble_totals.shape,
+                         (3, len(network.nodes), 11))
+        np.testing.assert_array_equal(model.ensemble_index, [0, 1, 2])
+
+        for index in range(3):
+            stochastic_wrapper.seed_iteration(11, index)
+            creator.new_stochastic_parameters()
+            project(network)
+            np.testing.assert_array_equal(model.ensemble_totals[index],
+                                          network.history.node_totals)
+            np.testing.assert_array_equal(model.ensemble_biomass[index],
+                                          network.history.node_biomass)
+
+    def test_override_changes_result(self):
+        creator = build(stochastic_spawn=True, n_years=10)
+        model = stochastic_wrapper.stochastic_model(creator)
+        default = model.run_stochastic_parallel(1, n_workers=2, seed=11)
+        node_name = creator.network.nodes[0].show_node_name()
+        creator.network.set_node_parameter(node_name, 'surv_max', 0.5)
+        model.counting_index_base = 0
+        changed = model.run_stochastic_parallel(1, n_workers=2, seed=11)
+        self.assertFalse(np.allclose(default, changed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+@requires_data
+class test_precision(unittest.TestCase):
+    """float32 projections stay close to float64."""
+
+    def test_float32(self):
+        exact = project(build().network)
+        for engine in ['object', 'tensor']:
+            with self.subTest(engine=engine):
+                network = build().network
+                network.set_dtype(np.float32)
+                approximate = project(network, engine)
+                self.assertEqual(approximate.dtype, np.float32)
+                self.assertLess(relative_difference(
+                    approximate.sum(axis=2), exact.sum(axis=2)), 1e-4)
+
+    def test_other_dtypes(self):
+        with self.assertRaises(ValueError):
+            build().network.set_dtype(np.float16)
+
+
+if __name__ == '__main__':
+    unittest.main()
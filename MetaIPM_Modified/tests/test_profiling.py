@@ -0,0 +1,32 @@
+import time
+import unittest
+
+from tests.model_data import build, project, requires_data
+
+
+@requires_data
+class test_profiling(unittest.TestCase):
+    """Profiled phases cover the whole projection."""
+
+    def test_phases_cover_run(self):
+        for engine in ['object', 'tensor']:
+            for tolerance in [None, 1e-3]:
+                with self.subTest(engine=engine, tolerance=tolerance):
+                    network = build().network
+                    network.set_convergence_check(tolerance=tolerance)
+                    network.set_profiling()
+                    start = time.perf_counter()
+                    project(network, engine)
+                    elapsed = time.perf_counter() - start
+                    report = network.profile.report()
+                    self.assertLessEqual(report['total_seconds'], elapsed)
+                    self.assertGreater(report['total_seconds'],
+                                       0.8 * elapsed)
+                    stopped = network.stopped_year is not None
+                    self.assertEqual('finish' in report['phases'], stopped)
+                    if tolerance is not None:
+                        self.assertTrue(stopped)
+
+
+if __name__ == '__main__':
+    unittest.main()
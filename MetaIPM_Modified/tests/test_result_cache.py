@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from MetaIPM import result_cache
+from tests.model_data import build, requires_data
+
+
+@requires_data
+class test_result_cache(unittest.TestCase):
+    """Runs are reused only when nothing affecting the outputs changed."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = result_cache.result_cache(directory.name)
+        self.creator = build(n_years=10)
+
+    def assertCounts(self, hits, misses):
+        self.assertEqual((self.cache.hits, self.cache.misses),
+                         (hits, misses))
+
+    def test_hit(self):
+        projected = self.cache.project(self.creator)
+        cached = self.cache.project(self.creator)
+        self.assertCounts(1, 1)
+        np.testing.assert_array_equal(cached['population'],
+                                      projected['population'])
+        self.cache.project(build(n_years=10))
+        self.assertCounts(2, 1)
+        self.cache.project(self.creator, engine='tensor')
+        self.assertCounts(2, 2)
+
+    def test_settings_miss(self):
+        network = self.creator.network
+        node_name = network.nodes[0].show_node_name()
+        changes = [
+            lambda: network.set_kernel_truncation(tolerance=1e-12),
+            lambda: network.set_kernel_cache(quantization=1e-3),
+            lambda: network.set_convergence_check(tolerance=1e-8),
+            lambda: network.set_dtype(np.float32),
+            lambda: network.set_history_retention('year_starts'),
+            lambda: network.set_node_parameter(node_name, 'surv_max', 0.5)]
+        self.cache.project(self.creator)
+        for misses, change in enumerate(changes, 2):
+            change()
+            self.cache.project(self.creator)
+            self.assertCounts(0, misses)
+        network.set_kernel_cache(maxsize=4, quantization=1e-3)
+        self.cache.project(self.creator)
+        self.assertCounts(1, len(changes) + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import sensitivity
+from MetaIPM import workers
+from tests.model_data import build, project, requires_data
+
+
+def growth_rates(creator, overrides):
+    '''Yearly growth rates of a copy of creator with overrides.'''
+    network = build(n_years=10).network
+    for key, value in creator.network.parameter_overrides.items():
+        network.set_parameter_override(key, value)
+    for key, value in overrides.items():
+        network.set_parameter_override(key, value)
+    totals = project(network).sum(axis=2).sum(axis=1)
+    totals = totals[:, :network.n_years * network.n_months:network.n_months]
+    return totals[:, 1:] / totals[:, :-1]
+
+
+@requires_data
+class test_sensitivity(unittest.TestCase):
+    """Perturbed runs in place match rebuilt networks."""
+
+    def test_central_difference(self):
+        creator = build(n_years=10)
+        node_name = creator.network.nodes[0].show_node_name()
+        creator.network.set_network_parameter('egg_viability', 0.5)
+        key = ('node', node_name, 'surv_max')
+        surv_max = creator.network.nodes[0].surv_max
+        analysis = sensitivity.sensitivity_analysis(
+            creator, [(key, [surv_max], 0.01)])
+        serial = analysis.run(n_workers=1)[0]
+        self.assertEqual(workers.creator.network.nodes[0].surv_max,
+                         surv_max)
+        self.assertNotIn(key, workers.creator.network.parameter_overrides)
+        parallel = analysis.run(n_workers=2)[0]
+        np.testing.assert_array_equal(serial, parallel)
+
+        lower = growth_rates(creator, {key: surv_max * 0.99})
+        upper = growth_rates(creator, {key: surv_max * 1.01})
+        np.testing.assert_allclose(
+            serial[0], (upper - lower) / (0.02 * surv_max), rtol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
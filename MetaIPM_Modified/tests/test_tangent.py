@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import tangent
+from tests.model_data import build, project, relative_difference, \
+    requires_data
+
+
+def node_totals(key, value):
+    '''Node totals of a network with one parameter overridden.'''
+    network = build(n_years=10).network
+    network.set_parameter_override(key, value)
+    return project(network, 'tensor').sum(axis=2).sum(axis=1)
+
+
+@requires_data
+class test_tangent(unittest.TestCase):
+    """Complex-step derivatives match central differences."""
+
+    def assertCentralDifference(self, key):
+        network = build(n_years=10).network
+        value = network.parameter_value(key)
+        tangents = tangent.tangent_projection(network, [key])
+        tangents.project()
+        step = 1e-5 * np.max(np.abs(value))
+        central = (node_totals(key, value + step) -
+                   node_totals(key, value - step)) / (2 * step)
+        self.assertLess(relative_difference(
+            tangents.node_totals_derivative[0], central), 1e-5)
+
+    def test_node_parameter(self):
+        network = build(n_years=10).network
+        self.assertCentralDifference(
+            ('node', network.nodes[0].show_node_name(), 'surv_max'))
+
+    def test_path_probability(self):
+        path_idx = build(n_years=10).network.populated_paths[0]
+        self.assertCentralDifference(
+            ('path', path_idx.show_start(), path_idx.show_end()))
+
+    def test_spawn_prob(self):
+        self.assertCentralDifference(('network', 'spawn_prob'))
+
+
+if __name__ == '__main__':
+    unittest.main()
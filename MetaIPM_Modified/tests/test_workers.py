@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from MetaIPM import sweep
+from MetaIPM import workers
+from tests.model_data import build, project, requires_data
+
+
+@requires_data
+class test_workers(unittest.TestCase):
+    """Sweep runs keep the template's settings and overrides."""
+
+    def test_sweep_matches_direct_runs(self):
+        creator = build(n_years=10)
+        network = creator.network
+        node_name = network.nodes[0].show_node_name()
+        network.set_dtype(np.float32)
+        network.set_network_parameter('egg_viability', 0.5)
+        values = [0.4, 0.6]
+        scenarios = sweep.scenario_sweep(
+            creator, grid={('node', node_name, 'surv_max'): values})
+        serial = scenarios.run(n_workers=1)
+        parallel = scenarios.run(n_workers=2)
+        np.testing.assert_array_equal(serial['Population'].values,
+                                      parallel['Population'].values)
+
+        year_starts = np.arange(network.n_years + 1) * network.n_months
+        for run_index, value in enumerate(values):
+            direct = build(n_years=10).network
+            direct.set_dtype(np.float32)
+            direct.set_network_parameter('egg_viability', 0.5)
+            direct.set_node_parameter(node_name, 'surv_max', value)
+            totals = project(direct).sum(axis=2).sum(axis=1)
+            run = serial[serial['run'] == run_index]
+            np.testing.assert_allclose(
+                run['Population'].values,
+                totals[:, year_starts].ravel(), rtol=1e-6)
+
+    def test_sweep_keeps_convergence_check(self):
+        creator = build()
+        creator.network.set_convergence_check(tolerance=1e-3)
+        node_name = creator.network.nodes[0].show_node_name()
+        scenarios = sweep.scenario_sweep(
+            creator, grid={('node', node_name, 'surv_max'): [0.5]})
+        scenarios.run(n_workers=1)
+        network = workers.creator.network
+        self.assertEqual(network.convergence_check.tolerance, 1e-3)
+        self.assertIsNotNone(network.stopped_year)
+        scenarios.run(n_workers=1, convergence={'tolerance': 1e-8})
+        self.assertEqual(
+            workers.creator.network.convergence_check.tolerance, 1e-8)
+
+        creator.network.set_convergence_check(tolerance=1e-3, fill=False)
+        with self.assertRaises(ValueError):
+            scenarios.run(n_workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()